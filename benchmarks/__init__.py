@@ -0,0 +1 @@
+"""Benchmarks of draft algorithms and the function."""
@@ -0,0 +1,285 @@
+"""Time draft algorithms and the function, and compare against a baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline benchmarks/baseline.json
+
+Each case records its best latency and, for drafts, the points of the line-up
+and its quality, i.e. points over the best points known for the same case. With
+a baseline, it exits with an error if any case got slower or worse.
+"""
+
+import argparse
+import asyncio
+import cProfile
+import functools
+import json
+import platform
+import random
+import sys
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import azure.functions as func
+
+import function
+from cartola_draft import LineUp, Player, PlayerPool, Scheme
+from cartola_draft.algorithm import BaseAlgorithm, DraftError
+from cartola_draft.algorithm.exact import Exact
+from cartola_draft.algorithm.genetic import Genetic
+from cartola_draft.algorithm.greedy import Greedy
+from cartola_draft.algorithm.local_search import LocalSearch
+from function.stream import parse_players_text
+from tests import helper
+
+SCALES = (1, 10, 100)
+PRICES = (100, 140)
+MAX_PLAYERS_PER_CLUB = 5
+# Exact prunes dominated players in quadratic time, so it is left out of the
+# biggest pools.
+MAX_EXACT_SCALE = 10
+# A case regresses if it gets twice as slow as its baseline, since shared
+# machines easily vary by half, ignoring differences smaller than the minimum.
+TOLERANCE = 1.0
+MIN_DIFF = 0.005  # seconds
+QUALITY_TOLERANCE = 0.01
+
+ALGORITHMS: Dict[str, Callable[[PlayerPool], BaseAlgorithm]] = {
+    "greedy": Greedy,
+    "genetic": lambda pool: Genetic(pool, backend="numpy", seed=0),
+    "exact": Exact,
+    "local": LocalSearch,
+}
+
+
+def scale_players(players: Sequence[Player], scale: int) -> List[Player]:
+    """Create a pool `scale` times bigger with perturbed copies of players."""
+    rng = random.Random(scale)
+    offset = max(player.id for player in players) + 1
+    scaled = list(players)
+    for copy in range(1, scale):
+        scaled += [
+            Player(
+                id=player.id + copy * offset,
+                position=player.position,
+                price=round(player.price * rng.uniform(0.9, 1.1), 2),
+                points=round(player.points * rng.uniform(0.9, 1.1), 2),
+                club=player.club,
+            )
+            for player in players
+        ]
+    return scaled
+
+
+def measure(func_: Callable[[], Any], repeat: int) -> Dict[str, Any]:
+    """Get the best latency of a function and its last result.
+
+    The best of some runs is less noisy than their mean or median, since slower
+    runs are mostly slowed down by other processes.
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func_()
+        times.append(time.perf_counter() - start)
+    return dict(seconds=min(times), result=result)
+
+
+def try_draft(algo: BaseAlgorithm, price: float, scheme: Scheme) -> Optional[LineUp]:
+    """Draft a line-up, or get None if it is not possible."""
+    try:
+        return algo.draft(price, scheme, MAX_PLAYERS_PER_CLUB)
+    except DraftError:
+        return None
+
+
+def draft_cases(pool: PlayerPool, scale: int, repeat: int) -> Iterator[Dict[str, Any]]:
+    """Time every algorithm on every scheme and price."""
+    for name, create in ALGORITHMS.items():
+        if name == "exact" and scale > MAX_EXACT_SCALE:
+            continue
+        algo = create(pool)
+        for scheme_name, counting in helper.SCHEMES_COUNTING.items():
+            for price in PRICES:
+                case = dict(
+                    name=f"draft/{name}/{scheme_name}/{price}/x{scale}",
+                    algorithm=name,
+                    scheme=str(scheme_name),
+                    price=price,
+                    scale=scale,
+                )
+
+                measured = measure(
+                    functools.partial(try_draft, algo, price, Scheme(counting)),
+                    repeat,
+                )
+                line_up = measured.pop("result")
+                case.update(measured)
+                case["points"] = None if line_up is None else line_up.points
+                yield case
+
+
+def bench_cases(pool: PlayerPool, scale: int, repeat: int) -> Iterator[Dict[str, Any]]:
+    """Time drafting the bench of greedy line-ups."""
+    algo = Greedy(pool)
+    for scheme_name, counting in helper.SCHEMES_COUNTING.items():
+        try:
+            line_up = algo.draft(max(PRICES), Scheme(counting), MAX_PLAYERS_PER_CLUB)
+        except DraftError:
+            continue
+        # pylint: disable-next=protected-access
+        measured = measure(functools.partial(algo._draft_bench, line_up), repeat)
+        del measured["result"]
+        yield dict(name=f"bench/{scheme_name}/x{scale}", scale=scale, **measured)
+
+
+def parse_cases(text: str, scale: int, repeat: int) -> Iterator[Dict[str, Any]]:
+    """Time parsing players."""
+    measured = measure(lambda: function.parse_players(json.loads(text)), repeat)
+    del measured["result"]
+    yield dict(name=f"parse/players/x{scale}", scale=scale, **measured)
+
+    measured = measure(lambda: parse_players_text(text).to_players(), repeat)
+    del measured["result"]
+    yield dict(name=f"parse/stream/x{scale}", scale=scale, **measured)
+
+
+def call(req: func.HttpRequest) -> func.HttpResponse:
+    """Run the function with the result cache cleared."""
+    function.RESULTS.clear()
+    return asyncio.run(function.main(req))
+
+
+def main_cases(text: str, scale: int, repeat: int) -> Iterator[Dict[str, Any]]:
+    """Time the whole function, with the result cache cleared before each run."""
+    for name in ALGORITHMS:
+        if name == "exact" and scale > MAX_EXACT_SCALE:
+            continue
+        args = dict(
+            algorithm=name,
+            scheme=helper.SCHEMES_COUNTING[442],
+            price=max(PRICES),
+            max_players_per_club=MAX_PLAYERS_PER_CLUB,
+        )
+        body = json.dumps(args)[:-1] + f', "players": {text}}}'
+        req = func.HttpRequest(method="POST", url="/", body=body.encode())
+
+        measured = measure(functools.partial(call, req), repeat)
+        status_code = measured.pop("result").status_code
+        yield dict(
+            name=f"main/{name}/x{scale}",
+            scale=scale,
+            status_code=status_code,
+            **measured,
+        )
+
+
+def add_quality(cases: List[Dict[str, Any]]):
+    """Compare points against the best points known for the same draft."""
+    best: Dict[tuple, float] = {}
+    for case in cases:
+        if case.get("points") is not None:
+            key = (case["scheme"], case["price"], case["scale"])
+            best[key] = max(best.get(key, case["points"]), case["points"])
+    for case in cases:
+        if "points" in case:
+            key = (case["scheme"], case["price"], case["scale"])
+            case["best_points"] = best.get(key)
+            case["quality"] = (
+                case["points"] / best[key]
+                if case["points"] is not None and best[key] > 0
+                else None
+            )
+
+
+def run(scales: Sequence[int], repeat: int) -> Dict[str, Any]:
+    """Run every benchmark case."""
+    players = helper.load_players()
+    cases: List[Dict[str, Any]] = []
+    for scale in scales:
+        scaled = scale_players(players, scale)
+        pool = PlayerPool(scaled)
+        text = json.dumps([dict(player) for player in scaled])
+        for cases_ in [
+            draft_cases(pool, scale, repeat),
+            bench_cases(pool, scale, repeat),
+            parse_cases(text, scale, repeat),
+            main_cases(text, scale, repeat),
+        ]:
+            for case in cases_:
+                print(f"{case['name']}: {case['seconds'] * 1000:.1f} ms", flush=True)
+                cases.append(case)
+    add_quality(cases)
+    return dict(
+        python=platform.python_version(),
+        machine=platform.machine(),
+        cases={case.pop("name"): case for case in cases},
+    )
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = TOLERANCE,
+) -> List[str]:
+    """Get the cases that regressed from the baseline."""
+    regressions = []
+    for name, case in results["cases"].items():
+        base = baseline["cases"].get(name)
+        if base is None:
+            continue
+        slower = case["seconds"] - base["seconds"]
+        if slower > MIN_DIFF and case["seconds"] > base["seconds"] * (1 + tolerance):
+            regressions.append(
+                f"{name}: {base['seconds'] * 1000:.1f} ms -> "
+                f"{case['seconds'] * 1000:.1f} ms"
+            )
+        if base.get("quality") is not None and (
+            case.get("quality") is None
+            or case["quality"] < base["quality"] - QUALITY_TOLERANCE
+        ):
+            regressions.append(
+                f"{name}: quality {base['quality']} -> {case['quality']}"
+            )
+    return regressions
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=list(SCALES))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--output", help="Write results to this JSON file.")
+    parser.add_argument("--baseline", help="Fail on regressions from this file.")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE)
+    parser.add_argument("--profile", action="store_true", help="Profile the run.")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Run benchmarks from the command line."""
+    args = parse_args(argv)
+    if args.profile:
+        profiler = cProfile.Profile()
+        results = profiler.runcall(run, args.scales, args.repeat)
+        profiler.print_stats(sort="cumulative")
+    else:
+        results = run(args.scales, args.repeat)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"Regression {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,8 @@
 """Cartola FC line-up draft."""
 
+import bisect
 from dataclasses import dataclass
-from typing import Dict, List, Optional, Sequence
+from typing import Dict, Iterator, List, Optional, Sequence, Union
 
 POSITIONS = ["goalkeeper", "fullback", "defender", "midfielder", "forward", "coach"]
 
@@ -14,10 +15,12 @@ def players_by_position(players: Sequence["Player"]):
     }
 
 
-@dataclass
+@dataclass(frozen=True)
 class Player:
     """Player"""
 
+    __slots__ = ("id", "position", "price", "points", "club")
+
     id: int  # pylint: disable=invalid-name
     position: str
     price: float
@@ -28,8 +31,59 @@ class Player:
         return self.id
 
     def __iter__(self):
-        for key, val in vars(self).items():
-            yield key, val
+        for key in self.__slots__:
+            yield key, getattr(self, key)
+
+
+class PlayerPool:
+    """Players indexed once and shared by every algorithm drafting from them.
+
+    Players are grouped by position sorted by points (descending) and by price
+    (ascending), along with the running best player along the price order.
+    """
+
+    def __init__(self, players: Sequence[Player]):
+        self.players = list(players)
+        self.by_points = sorted(self.players, key=lambda p: p.points, reverse=True)
+
+        self.by_position: Dict[str, List[Player]] = {pos: [] for pos in POSITIONS}
+        for player in self.by_points:
+            self.by_position.setdefault(player.position, []).append(player)
+
+        self.by_price: Dict[str, List[Player]] = {}
+        self.prices: Dict[str, List[float]] = {}
+        self.best_by_price: Dict[str, List[Player]] = {}
+        for pos, players_from_pos in self.by_position.items():
+            self.by_price[pos] = sorted(players_from_pos, key=lambda p: p.price)
+            self.prices[pos] = [p.price for p in self.by_price[pos]]
+            self.best_by_price[pos] = []
+            for player in self.by_price[pos]:
+                best = self.best_by_price[pos][-1:]
+                if best and best[0].points > player.points:
+                    player = best[0]
+                self.best_by_price[pos].append(player)
+
+        self.clubs = sorted({player.club for player in self.players})
+
+    @classmethod
+    def of(cls, players: Union[Sequence[Player], "PlayerPool"]) -> "PlayerPool":
+        """Get a pool from players, reusing it if it is already a pool."""
+        if isinstance(players, PlayerPool):
+            return players
+        return cls(players)
+
+    def __len__(self):
+        return len(self.players)
+
+    def __iter__(self) -> Iterator[Player]:
+        return iter(self.players)
+
+    def best_cheaper_than(self, position: str, price: float) -> Optional[Player]:
+        """Get the player with most points that is cheaper than a price."""
+        index = bisect.bisect_left(self.prices.get(position, []), price)
+        if index == 0:
+            return None
+        return self.best_by_price[position][index - 1]
 
 
 @dataclass
@@ -55,22 +109,77 @@ class Scheme:
 
     def is_valid(self):
         """Check if scheme is valid."""
-        players = sum([count for pos, count in self.positions.items() if pos != "coach"])
+        players = sum(
+            [count for pos, count in self.positions.items() if pos != "coach"]
+        )
         coach = self.positions["coach"]
         return players == 11 and coach <= 1
 
 
-@dataclass
 class LineUp:
-    """Squad line-up"""
-
-    scheme: Scheme
-    players: List[Player]
-    bench: Optional[List[Player]] = None
-
-    def __post_init__(self):
-        if self.bench is None:
-            self.bench = [None]
+    """Squad line-up
+
+    Price, points, players per club and players per position are cached and
+    updated incrementally, so players should be changed through item
+    assignment, `add_player` and `remove_player` rather than by mutating
+    `players` directly.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    __slots__ = (
+        "scheme",
+        "players",
+        "bench",
+        "_price",
+        "_points",
+        "_clubs",
+        "_club_sizes",
+        "_max_per_club",
+        "_positions",
+        "_remaining",
+        "_extra",
+        "stop_reason",
+    )
+
+    def __init__(
+        self,
+        scheme: Scheme,
+        players: List[Player],
+        bench: Optional[List[Player]] = None,
+    ):
+        self.scheme = scheme
+        self.players = players
+        self.bench: list = [None] if bench is None else bench
+        self.stop_reason: Optional[str] = None
+        self._price = sum(player.price for player in players)
+        self._points = sum(player.points for player in players)
+        self._clubs: Dict[int, int] = {}
+        # How many clubs have each amount of players, to track the maximum. The
+        # first entry is left unused.
+        self._club_sizes = [0, 0]
+        self._max_per_club = 0
+        self._positions: Dict[str, int] = {}
+        self._remaining = sum(scheme.values())
+        self._extra = 0
+        for player in players:
+            self._join(player.club)
+            self._fill(player.position)
+
+    def __repr__(self):
+        return (
+            f"{self.__class__.__name__}(scheme={self.scheme!r}, "
+            f"players={self.players!r}, bench={self.bench!r})"
+        )
+
+    def __eq__(self, other):
+        if not isinstance(other, LineUp):
+            return NotImplemented
+        return (self.scheme, self.players, self.bench) == (
+            other.scheme,
+            other.players,
+            other.bench,
+        )
 
     def __len__(self):
         return len(self.players)
@@ -79,7 +188,9 @@ class LineUp:
         return self.players[index]
 
     def __setitem__(self, index, value):
+        self._discount(self.players[index])
         self.players[index] = value
+        self._count(value)
 
     def __iter__(self):
         for player in self.players:
@@ -88,6 +199,61 @@ class LineUp:
     def __contains__(self, value):
         return value in self.players
 
+    def _fill(self, position: str):
+        """Count a player in a position, either in a free slot or as an extra."""
+        count = self._positions.get(position, 0) + 1
+        self._positions[position] = count
+        if count <= self.scheme.positions.get(position, 0):
+            self._remaining -= 1
+        else:
+            self._extra += 1
+
+    def _vacate(self, position: str):
+        """Discount a player from a position."""
+        count = self._positions[position]
+        self._positions[position] = count - 1
+        if count <= self.scheme.positions.get(position, 0):
+            self._remaining += 1
+        else:
+            self._extra -= 1
+
+    def _join(self, club: int):
+        """Count a player in a club."""
+        count = self._clubs.get(club, 0) + 1
+        self._clubs[club] = count
+        if count == len(self._club_sizes):
+            self._club_sizes.append(0)
+        self._club_sizes[count - 1] -= 1
+        self._club_sizes[count] += 1
+        if count > self._max_per_club:
+            self._max_per_club = count
+
+    def _leave(self, club: int):
+        """Discount a player from a club."""
+        count = self._clubs[club]
+        if count == 1:
+            del self._clubs[club]
+        else:
+            self._clubs[club] = count - 1
+        self._club_sizes[count] -= 1
+        self._club_sizes[count - 1] += 1
+        if count == self._max_per_club and self._club_sizes[count] == 0:
+            self._max_per_club = count - 1
+
+    def _count(self, player: Player):
+        """Add a player to the cached aggregates."""
+        self._price += player.price
+        self._points += player.points
+        self._join(player.club)
+        self._fill(player.position)
+
+    def _discount(self, player: Player):
+        """Remove a player from the cached aggregates."""
+        self._price -= player.price
+        self._points -= player.points
+        self._leave(player.club)
+        self._vacate(player.position)
+
     @property
     def players_by_position(self) -> Dict[str, List[Player]]:
         """Get line-up players by position."""
@@ -96,45 +262,78 @@ class LineUp:
     @property
     def points(self):
         """Get line-up points."""
-        return sum([player.points for player in self.players])
+        return self._points
 
     @property
     def price(self):
         """Get line-up price."""
-        sum_ = 0
-        for player in self.players:
-            sum_ += player.price
-        return sum_
+        return self._price
 
     @property
     def clubs(self):
         """Get amount of different clubs in the line-up."""
-        return len({player.club for player in self.players})
+        return len(self._clubs)
 
     @property
     def players_per_club(self):
         """Get players per club."""
-        return {player.club: self.players.count(player) for player in self.players}
+        return dict(self._clubs)
+
+    @property
+    def max_per_club(self) -> int:
+        """Get the most players from a single club."""
+        return self._max_per_club
+
+    def players_from(self, club: int) -> int:
+        """Get amount of players from a club."""
+        return self._clubs.get(club, 0)
+
+    @property
+    def remaining(self) -> int:
+        """Get amount of slots of the scheme still to be filled."""
+        return self._remaining
 
     def add_player(self, player: Player):
         """Add player to the line-up."""
         self.players.append(player)
+        self._count(player)
 
     def remove_player(self, player: Player):
         """Remove player from the line-up."""
         self.players.remove(player)
+        self._discount(player)
 
     def is_valid(self):
         """Check if it follows the scheme."""
-        line_up_pos = [player.position for player in self.players]
-        ref_pos = [key for key, val in self.scheme.items() for _ in range(val)]
-        return sorted(line_up_pos) == sorted(ref_pos)
+        return self._remaining == 0 and self._extra == 0
 
     def missing(self, position: str) -> bool:
         """Check if line-up still missing players from a certain position."""
-        players_from_pos = [p for p in self.players if p.position == position]
-        return len(players_from_pos) < self.scheme[position]
+        return self._positions.get(position, 0) < self.scheme[position]
+
+    def can_add(self, player: Player, budget: float, max_players_per_club: int):
+        """Check if a player fits the scheme, the budget and the club limit."""
+        return (
+            self.missing(player.position)
+            and self._price + player.price <= budget
+            and self._clubs.get(player.club, 0) < max_players_per_club
+            and player not in self.players
+        )
 
     def copy(self) -> "LineUp":
         """Copy this instance."""
-        return LineUp(scheme=self.scheme, players=list(self.players))
+        # pylint: disable=protected-access
+        line_up = LineUp.__new__(LineUp)
+        line_up.scheme = self.scheme
+        line_up.players = list(self.players)
+        line_up.bench = [None]
+        line_up.stop_reason = None
+        line_up._price = self._price
+        line_up._points = self._points
+        line_up._clubs = dict(self._clubs)
+        line_up._club_sizes = list(self._club_sizes)
+        line_up._max_per_club = self._max_per_club
+        line_up._positions = dict(self._positions)
+        line_up._remaining = self._remaining
+        line_up._extra = self._extra
+        return line_up
@@ -1,41 +1,117 @@
 """Cartola FC optimization algorithms."""
 
 import abc
-from typing import Sequence, List
+import time
+from typing import ContextManager, Iterable, NamedTuple, Optional, Sequence, List, Union
 
-from .. import Player, Scheme, LineUp, players_by_position
+from .. import Player, PlayerPool, Scheme, LineUp
+from .stats import NO_TIMER, Stats
 
 
 class DraftError(Exception):
     """Error on drating players."""
 
 
+def deadline(time_budget: Optional[float]) -> Optional[float]:
+    """Get the monotonic clock time when a time budget (in seconds) runs out."""
+    if time_budget is None:
+        return None
+    return time.monotonic() + time_budget
+
+
+def stop_reason(
+    history: Sequence[float],
+    patience: Optional[int],
+    deadline_: Optional[float],
+) -> Optional[str]:
+    """Check if an iterative draft should stop before its last iteration.
+
+    It stops on "time_budget" once the deadline has passed and on "converged"
+    when the best points did not improve over the last `patience` iterations.
+    """
+    if deadline_ is not None and time.monotonic() >= deadline_:
+        return "time_budget"
+    if patience is not None and len(history) > patience:
+        if max(history[-patience:]) <= history[-patience - 1]:
+            return "converged"
+    return None
+
+
+class DraftRequest(NamedTuple):
+    """Arguments of a single draft."""
+
+    price: float
+    scheme: Scheme
+    max_players_per_club: int
+
+
 class BaseAlgorithm(abc.ABC):
     """Algorithm base class."""
 
     # pylint: disable=too-few-public-methods
 
+    # Whether the same arguments always draft the same line-up.
+    deterministic = True
+    # Set to collect counters and phase timers of drafts.
+    stats: Optional[Stats] = None
+
     @abc.abstractmethod
-    def __init__(self, players: Sequence[Player]):
+    def __init__(self, players: Union[Sequence[Player], PlayerPool]):
         """Initializer"""
-        self.players = players
-        self.players_by_position = players_by_position(self.players)
+        self.pool = PlayerPool.of(players)
+        self.players = self.pool.players
+        self.players_by_position = self.pool.by_position
+
+    def _timer(self, phase: str) -> ContextManager:
+        """Time a phase of the draft if stats are set."""
+        return NO_TIMER if self.stats is None else self.stats.timer(phase)
 
     def _draft_bench(self, line_up: LineUp) -> List[Player]:
         """Draft players for the bench of a given line up."""
         bench = []
-        for pos, count in line_up.scheme.items():
-            if "coach" in pos:
-                continue
-            if count > 0:
-                price = min([p.price for p in line_up.players_by_position[pos]])
-                players = [p for p in self.players_by_position[pos] if p.price < price]
-                if len(players) == 0:
+        with self._timer("bench"):
+            for pos, count in line_up.scheme.items():
+                if "coach" in pos:
                     continue
-                player = sorted(players, key=lambda p: p.points)[-1]
-                bench.append(player)
+                if count > 0:
+                    price = min([p.price for p in line_up.players_by_position[pos]])
+                    player = self.pool.best_cheaper_than(pos, price)
+                    if player is None:
+                        continue
+                    bench.append(player)
         return bench
 
     @abc.abstractmethod
     def draft(self, price: float, scheme: Scheme, max_players_per_club: int) -> LineUp:
         """Draft players following an specified scheme."""
+
+    def draft_many(
+        self,
+        requests: Iterable[DraftRequest],
+    ) -> List[Union[LineUp, DraftError]]:
+        """Draft a line-up for each request, sharing the players indexes.
+
+        Requests that cannot be drafted get their error instead of a line-up.
+        """
+        results: List[Union[LineUp, DraftError]] = []
+        for request in requests:
+            try:
+                results.append(self.draft(*request))
+            except DraftError as error:
+                results.append(error)
+        return results
+
+    def draft_best(self, requests: Iterable[DraftRequest]) -> LineUp:
+        """Draft the line-up with most points among many requests."""
+        requests = list(requests)
+        line_ups = [
+            line_up
+            for request, line_up in zip(requests, self.draft_many(requests))
+            if isinstance(line_up, LineUp)
+            and line_up.is_valid()
+            and line_up.price <= request.price
+            and line_up.max_per_club <= request.max_players_per_club
+        ]
+        if not line_ups:
+            raise DraftError("There are not enough players to form a line-up.")
+        return max(line_ups, key=lambda line_up: line_up.points)
@@ -0,0 +1,230 @@
+"""Exact algorithm."""
+
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import BaseAlgorithm, DraftError
+from .. import Player, PlayerPool, Scheme, LineUp
+
+EPS = 1e-9
+
+
+def _cents(value: float) -> int:
+    """Convert a price to cents."""
+    return int(round(value * 100))
+
+
+def _dominators(player: Player, players: Sequence[Player]) -> List[Player]:
+    """Get players that are cheaper-or-equal and score at least as much."""
+    return [
+        other
+        for other in players
+        if other is not player
+        and other.price <= player.price
+        and other.points >= player.points
+        and (
+            other.price < player.price
+            or other.points > player.points
+            or other.id < player.id
+        )
+    ]
+
+
+def _is_dominated(
+    player: Player,
+    players: Sequence[Player],
+    count: int,
+    n_full_clubs: int,
+) -> bool:
+    """Check if any optimal line-up can always swap this player for a better one.
+
+    Up to `count - 1` dominators may already be in the line-up and the biggest
+    `n_full_clubs` clubs may already be at the club limit. If a dominator is
+    still left after that, the player can be swapped without losing points.
+    """
+    dominators = _dominators(player, players)
+    per_club = Counter(other.club for other in dominators if other.club != player.club)
+    blocked = sum(sorted(per_club.values(), reverse=True)[:n_full_clubs])
+    return len(dominators) - blocked - (count - 1) >= 1
+
+
+class Exact(BaseAlgorithm):
+    """Exact algorithm.
+
+    Dominated players are pruned per position, then a knapsack dynamic
+    programming over prices in cents gives, for every remaining budget, the
+    maximum points reachable by the next positions ignoring the club limit.
+    That table bounds a depth-first branch-and-bound that enforces the club
+    limit and returns a line-up with the maximum points.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self, players: Union[Sequence[Player], PlayerPool]):
+        # pylint: disable=useless-parent-delegation
+        super().__init__(players)
+
+    @staticmethod
+    def _prune(
+        players: Sequence[Player],
+        count: int,
+        n_full_clubs: int,
+    ) -> List[Player]:
+        """Drop players that are never needed in an optimal line-up."""
+        return [
+            player
+            for player in players
+            if not _is_dominated(player, players, count, n_full_clubs)
+        ]
+
+    @staticmethod
+    def _knapsack(
+        players: Sequence[Player],
+        count: int,
+        following: np.ndarray,
+    ) -> np.ndarray:
+        """Best points of `count` players plus the following positions per budget."""
+        table = np.full((count + 1, len(following)), -np.inf)
+        table[0] = following
+        for player in players:
+            price = _cents(player.price)
+            if price >= len(following):
+                continue
+            for j in range(count, 0, -1):
+                candidate = table[j - 1, : len(following) - price] + player.points
+                np.maximum(table[j, price:], candidate, out=table[j, price:])
+        return table[count]
+
+    def draft(self, price: float, scheme: Scheme, max_players_per_club: int) -> LineUp:
+        """Draft players following an specified scheme."""
+        # pylint: disable=too-many-locals
+        budget = int(np.floor(price * 100 + EPS))
+        if budget < 0:
+            raise DraftError("There are not enough players to form a line-up.")
+        n_full_clubs = (sum(scheme.values()) - 1) // max_players_per_club
+
+        positions = [(pos, count) for pos, count in scheme.items() if count > 0]
+        candidates: Dict[str, List[Player]] = {}
+        with self._timer("prune"):
+            for pos, count in positions:
+                pruned = self._prune(self.players_by_position[pos], count, n_full_clubs)
+                candidates[pos] = sorted(pruned, key=lambda p: p.points, reverse=True)
+
+        # The most expensive line-up bounds how big the budget table needs to be.
+        budget = min(
+            budget,
+            sum(
+                sum(sorted(_cents(p.price) for p in candidates[pos])[-count:])
+                for pos, count in positions
+            ),
+        )
+
+        # bounds[i][b]: max points from positions i onwards with budget b.
+        bounds = [np.zeros(budget + 1)]
+        with self._timer("knapsack"):
+            for pos, count in reversed(positions):
+                bounds.insert(0, self._knapsack(candidates[pos], count, bounds[0]))
+        if not np.isfinite(bounds[0][budget]):
+            raise DraftError("There are not enough players to form a line-up.")
+
+        search = _BranchAndBound(candidates, positions, bounds, max_players_per_club)
+        with self._timer("search"):
+            search.run(budget)
+        if search.best is None:
+            raise DraftError("There are not enough players to form a line-up.")
+
+        line_up = LineUp(scheme=scheme, players=list(search.best))
+        line_up.bench = self._draft_bench(line_up)
+        return line_up
+
+
+class _BranchAndBound:
+    """Depth-first search over players sorted by points."""
+
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+    def __init__(
+        self,
+        candidates: Dict[str, List[Player]],
+        positions: List[Tuple[str, int]],
+        bounds: List[np.ndarray],
+        max_players_per_club: int,
+    ):
+        self.positions = positions
+        self.bounds = bounds
+        self.max_players_per_club = max_players_per_club
+        self.players = [candidates[pos] for pos, _ in positions]
+        self.prices = [[_cents(p.price) for p in players] for players in self.players]
+
+        # Prefix sums of points, to bound the next picks inside a position.
+        self.top_points = [
+            np.concatenate([[0], np.cumsum([p.points for p in players])])
+            for players in self.players
+        ]
+        # Cheapest sum of r players from index t onwards, for r up to count.
+        self.min_prices = [
+            self._min_prices(prices, count)
+            for prices, (_, count) in zip(self.prices, positions)
+        ]
+
+        self.chosen: List[Player] = []
+        self.clubs: Counter = Counter()
+        self.best: Optional[List[Player]] = None
+        self.best_points = -np.inf
+
+    @staticmethod
+    def _min_prices(prices: List[int], count: int) -> np.ndarray:
+        """Sum of the r cheapest prices of every suffix."""
+        table = np.full((count + 1, len(prices) + 1), np.iinfo(np.int64).max // 4)
+        table[0] = 0
+        cheapest: List[int] = []
+        for t in range(len(prices) - 1, -1, -1):
+            cheapest = sorted(cheapest + [prices[t]])[:count]
+            for r in range(1, len(cheapest) + 1):
+                table[r, t] = sum(cheapest[:r])
+        return table
+
+    def run(self, budget: int):
+        """Run the search."""
+        self._search(0, 0, self.positions[0][1], budget, 0.0)
+
+    def _search(self, i: int, start: int, remaining: int, budget: int, points: float):
+        """Pick the next player of position i."""
+        # pylint: disable=too-many-arguments
+        if remaining == 0:
+            if i + 1 == len(self.positions):
+                if points > self.best_points + EPS:
+                    self.best_points = points
+                    self.best = list(self.chosen)
+                return
+            i += 1
+            start = 0
+            remaining = self.positions[i][1]
+
+        players = self.players[i]
+        prices = self.prices[i]
+        following = self.bounds[i + 1]
+        for t in range(start, len(players) - remaining + 1):
+            # Bound is non-increasing in t, so it is safe to stop at the first cut.
+            left = budget - self.min_prices[i][remaining, t]
+            if left < 0:
+                break
+            top = self.top_points[i][t + remaining] - self.top_points[i][t]
+            if points + top + following[left] <= self.best_points + EPS:
+                break
+
+            player = players[t]
+            if prices[t] > budget:
+                continue
+            if self.clubs[player.club] >= self.max_players_per_club:
+                continue
+
+            self.chosen.append(player)
+            self.clubs[player.club] += 1
+            self._search(
+                i, t + 1, remaining - 1, budget - prices[t], points + player.points
+            )
+            self.clubs[player.club] -= 1
+            self.chosen.pop()
@@ -1,41 +1,95 @@
 """Genetic algorithm."""
 
+import bisect
+import math
+import os
 import random
-from typing import List, Sequence
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, FrozenSet, List, Optional, Sequence, Tuple, Union
 
-from . import BaseAlgorithm, DraftError
-from .. import Player, Scheme, LineUp
+import numpy as np
+
+from . import BaseAlgorithm, DraftError, deadline, stop_reason
+from .population import Population, evolve_island, init_worker
+from .. import Player, PlayerPool, Scheme, LineUp
+
+BACKENDS = ["python", "numpy"]
+# Draws of a mutation before it is given up.
+MAX_MUTATION_DRAWS = 10
 
 
 class Genetic(BaseAlgorithm):
     """Genetic algorithm."""
 
-    # pylint: disable=too-few-public-methods
+    # pylint: disable=too-few-public-methods,too-many-instance-attributes
 
     def __init__(
         self,
-        players: Sequence[Player],
+        players: Union[Sequence[Player], PlayerPool],
         n_generations: int = 500,
         n_individuals: int = 100,
         tournament_size: int = 100,
         n_tournament_winners: int = 5,
         max_n_mutations: int = 3,
+        backend: str = "python",
+        n_islands: int = 1,
+        migration_interval: int = 50,
+        n_workers: Optional[int] = None,
+        cache_size: int = 10000,
+        patience: Optional[int] = None,
+        time_budget: Optional[float] = None,
+        seed: Optional[int] = None,
+        crossover_rate: float = 0.5,
     ):
-        # pylint: disable=too-many-arguments
+        # pylint: disable=too-many-arguments,too-many-locals
         super().__init__(players)
+        if backend not in BACKENDS:
+            raise ValueError(f"{backend} is not a valid backend.")
+        if n_islands > 1 and backend != "numpy":
+            raise ValueError("Islands are only supported by the numpy backend.")
         self.n_generations = n_generations
         self.n_individuals = n_individuals
         self.tournament_size = tournament_size
         self.n_tournament_winners = n_tournament_winners
         self.max_n_mutations = max_n_mutations
+        self.backend = backend
+        self.n_islands = n_islands
+        self.migration_interval = migration_interval
+        self.n_workers = n_workers
+        self.cache_size = cache_size
+        self.patience = patience
+        self.time_budget = time_budget
+        self.seed = seed
+        self.crossover_rate = crossover_rate
+        self.random = random.Random(seed)
+        # Same seed and no time budget always drafts the same line-up.
+        self.deterministic = seed is not None and time_budget is None
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._cache: "OrderedDict[FrozenSet[int], Tuple[float, float, int]]"
+        self._cache = OrderedDict()
         self.history: List[float] = []
+        self.population: Optional[Population] = None
+        if backend == "numpy":
+            self.population = Population(
+                self.players,
+                n_individuals=n_individuals,
+                tournament_size=tournament_size,
+                n_tournament_winners=n_tournament_winners,
+                max_n_mutations=max_n_mutations,
+            )
 
-    @staticmethod
-    def _create_random_line_up(players: Sequence[Player], scheme: Scheme) -> LineUp:
+    def _create_random_line_up(
+        self,
+        players: Sequence[Player],
+        scheme: Scheme,
+        max_players_per_club: int,
+    ) -> LineUp:
         """Create a random line up."""
         # Make a copy and shuffle.
         players = list(players)
-        random.shuffle(players)
+        self.random.shuffle(players)
 
         # Create line-up without any player.
         line_up = LineUp(scheme=scheme, players=[])
@@ -43,13 +97,13 @@ class Genetic(BaseAlgorithm):
         # Iterate over players until it is able to fill the team.
         for player in players:
 
-            # Check if the team has room for this player.
-            if line_up.missing(player.position):
+            # Check if the team has room for this player within the club limit.
+            if line_up.can_add(player, math.inf, max_players_per_club):
                 line_up.add_player(player)
 
-            # Check if the team is ready.
-            if line_up.is_valid():
-                return line_up
+                # Check if the team is ready.
+                if line_up.is_valid():
+                    return line_up
 
         raise DraftError("There are not enough players to form a line-up.")
 
@@ -62,10 +116,38 @@ class Genetic(BaseAlgorithm):
         """Calculate fitness metric. The greater the better"""
         if line_up.price > max_price:
             return max_price - line_up.price
-        if max(line_up.players_per_club.values()) > max_players_per_club:
+        if line_up.max_per_club > max_players_per_club:
             return 0
         return line_up.points
 
+    def _evaluate(
+        self,
+        line_up: LineUp,
+        max_price: float,
+        max_players_per_club: int,
+    ) -> Tuple[float, float, int]:
+        """Get fitness, price and club limit violation, using an LRU cache.
+
+        The cache is keyed by the set of player ids, so the same line-up in any
+        order is evaluated once. It is cleared at the start of every draft.
+        """
+        key = frozenset(player.id for player in line_up.players)
+        if key in self._cache:
+            self.cache_hits += 1
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        self.cache_misses += 1
+        if self.stats is not None:
+            self.stats.count("evaluations")
+        fitness = self._calculate_fitness(line_up, max_price, max_players_per_club)
+        violation = line_up.max_per_club - max_players_per_club
+        evaluation = (fitness, line_up.price, max(violation, 0))
+        self._cache[key] = evaluation
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return evaluation
+
     def _rank(
         self,
         line_ups: Sequence[LineUp],
@@ -75,11 +157,11 @@ class Genetic(BaseAlgorithm):
         """Rank line ups based on the fitness."""
         iterable = sorted(
             line_ups,
-            key=lambda x: self._calculate_fitness(
+            key=lambda x: self._evaluate(
                 x,
                 max_price=max_price,
                 max_players_per_club=max_players_per_club,
-            ),
+            )[0],
             reverse=True,
         )
         return list(iterable)
@@ -93,63 +175,258 @@ class Genetic(BaseAlgorithm):
         """Select best line up."""
         tournament_size = min(len(line_ups), self.tournament_size)
         ranked = self._rank(
-            random.sample(line_ups, tournament_size),
+            self.random.sample(line_ups, tournament_size),
             max_price=max_price,
             max_players_per_club=max_players_per_club,
         )
         return ranked[: self.n_tournament_winners]
 
-    def _change_random_player(self, line_up: LineUp):
-        """Change a random player from the line up."""
-        i = random.randrange(len(line_up))
-        new_player = random.choice(self.players_by_position[line_up[i].position])
+    def _change_random_player(
+        self,
+        line_up: LineUp,
+        max_price: float,
+        max_players_per_club: int,
+    ):
+        """Change a random player for another one that keeps the line-up valid.
+
+        Replacements are drawn from the players of the same position that cost
+        at most the replaced player plus the money left, using the pool prices
+        index, so a line-up over the budget only gets cheaper. Draws already in
+        the line-up or from a full club are redrawn a few times, then the
+        mutation is given up.
+        """
+        i = self.random.randrange(len(line_up))
+        old = line_up[i]
+        limit = old.price + max(max_price - line_up.price, 0.0)
+        candidates = self.pool.by_price[old.position]
+        n_affordable = bisect.bisect_right(self.pool.prices[old.position], limit)
 
-        if new_player in line_up:
-            self._change_random_player(line_up)
-        else:
-            line_up[i] = new_player
+        ids = {player.id for player in line_up.players}
+        for _ in range(MAX_MUTATION_DRAWS):
+            new = candidates[self.random.randrange(n_affordable)]
+            if new.id not in ids and (
+                new.club == old.club
+                or line_up.players_from(new.club) < max_players_per_club
+            ):
+                line_up[i] = new
+                return
+            if self.stats is not None:
+                self.stats.count("mutation_retries")
 
-    def _create_offsprings(self, line_ups: Sequence[LineUp], size: int) -> List[LineUp]:
+    def _crossover(self, first: LineUp, second: LineUp) -> LineUp:
+        """Create a line-up drawing each position from the players of both parents."""
+        parents: Dict[str, Dict[int, Player]] = {}
+        for player in first.players + second.players:
+            parents.setdefault(player.position, {})[player.id] = player
+
+        players: List[Player] = []
+        for pos, count in first.scheme.items():
+            if count > 0:
+                players += self.random.sample(list(parents[pos].values()), count)
+        return LineUp(scheme=first.scheme, players=players)
+
+    def _create_offsprings(
+        self,
+        line_ups: Sequence[LineUp],
+        size: int,
+        max_price: float,
+        max_players_per_club: int,
+    ) -> List[LineUp]:
         """Create offsprings for given line ups."""
         offsprings = []
         for _ in range(size):
 
-            line_up = random.choice(line_ups).copy()
+            if len(line_ups) > 1 and self.random.random() < self.crossover_rate:
+                line_up = self._crossover(*self.random.sample(line_ups, 2))
+            else:
+                line_up = self.random.choice(line_ups).copy()
 
             # Sample how many players to mutate.
-            n_mutations = round(random.triangular(1, self.max_n_mutations, 0))
+            n_mutations = round(self.random.triangular(1, self.max_n_mutations, 0))
             for _ in range(int(n_mutations)):
-                self._change_random_player(line_up)
+                self._change_random_player(line_up, max_price, max_players_per_club)
 
             offsprings.append(line_up)
 
         return offsprings
 
-    def draft(self, price: float, scheme: Scheme, max_players_per_club: int) -> LineUp:
-        """Draft players following an specified scheme."""
-        line_ups = [
-            self._create_random_line_up(self.players, scheme)
-            for _ in range(self.n_individuals)
+    def _record_generation(
+        self,
+        line_ups: Sequence[LineUp],
+        max_price: float,
+        max_players_per_club: int,
+    ):
+        """Record diversity and invalid line-ups of a generation in the stats."""
+        assert self.stats is not None
+        n_unique = len(
+            {frozenset(p.id for p in line_up.players) for line_up in line_ups}
+        )
+        n_invalid = sum(
+            line_up.price > max_price or line_up.max_per_club > max_players_per_club
+            for line_up in line_ups
+        )
+        self.stats.generation(
+            self.history[-1], n_unique, int(n_invalid), size=len(line_ups)
+        )
+
+    def _draft_numpy(
+        self,
+        price: float,
+        scheme: Scheme,
+        max_players_per_club: int,
+        deadline_: Optional[float],
+    ) -> LineUp:
+        """Draft players using the array-backed population."""
+        assert self.population is not None
+        with self._timer("create"):
+            population = self.population.create(scheme, self.n_individuals)
+        population, self.history, reason = self.population.evolve(
+            population,
+            n_generations=self.n_generations,
+            price=price,
+            scheme=scheme,
+            max_players_per_club=max_players_per_club,
+            patience=self.patience,
+            deadline=deadline_,
+        )
+
+        best = self.population.to_line_up(
+            self.population.best(population, price, max_players_per_club), scheme
+        )
+        best.stop_reason = reason
+        return best
+
+    def _draft_islands(
+        self,
+        price: float,
+        scheme: Scheme,
+        max_players_per_club: int,
+        deadline_: Optional[float],
+    ) -> LineUp:
+        """Draft players evolving islands in parallel processes.
+
+        Each island evolves for `migration_interval` generations in a worker,
+        then its best `n_tournament_winners` line-ups replace the worst ones of
+        the next island, in a ring. Convergence is checked between epochs.
+        """
+        # pylint: disable=too-many-locals
+        assert self.population is not None
+        islands = [
+            self.population.create(scheme, self.n_individuals)
+            for _ in range(self.n_islands)
         ]
+        n_workers = self.n_workers or min(self.n_islands, os.cpu_count() or 1)
+        reason = "generations"
+
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=init_worker,
+            initargs=(self.population,),
+        ) as executor:
+            for start in range(0, self.n_generations, self.migration_interval):
+                n_generations = min(self.migration_interval, self.n_generations - start)
+                seeds = self.population.rng.integers(2**32, size=self.n_islands)
+                futures = [
+                    executor.submit(
+                        evolve_island,
+                        island,
+                        n_generations,
+                        price,
+                        scheme,
+                        max_players_per_club,
+                        int(seed),
+                        deadline_,
+                    )
+                    for island, seed in zip(islands, seeds)
+                ]
+                with self._timer("evolve"):
+                    results = [future.result() for future in futures]
+                islands = [island for island, _, _ in results]
+
+                # Islands may stop at different generations when time is over.
+                length = min(len(hist) for _, hist, _ in results)
+                histories = [hist[:length] for _, hist, _ in results]
+                self.history += [float(x) for x in np.max(histories, axis=0)]
+
+                # Migrate best line-ups to the next island.
+                with self._timer("migrate"):
+                    migrants = [
+                        self.population.elite(
+                            island,
+                            self.n_tournament_winners,
+                            price,
+                            max_players_per_club,
+                        )
+                        for island in islands
+                    ]
+                    islands = [
+                        self.population.migrate(
+                            island, migrants[i - 1], price, max_players_per_club
+                        )
+                        for i, island in enumerate(islands)
+                    ]
+
+                stop = stop_reason(self.history, self.patience, deadline_)
+                if stop is not None:
+                    reason = stop
+                    break
+
+        best = self.population.to_line_up(
+            self.population.best(np.vstack(islands), price, max_players_per_club),
+            scheme,
+        )
+        best.stop_reason = reason
+        return best
+
+    def _draft_python(
+        self,
+        price: float,
+        scheme: Scheme,
+        max_players_per_club: int,
+        deadline_: Optional[float],
+    ) -> LineUp:
+        """Draft players using line-up objects."""
+        self._cache.clear()
+        with self._timer("create"):
+            line_ups = [
+                self._create_random_line_up(self.players, scheme, max_players_per_club)
+                for _ in range(self.n_individuals)
+            ]
+        reason = "generations"
 
         for _ in range(self.n_generations):
 
-            ranked = self._rank(
-                line_ups,
-                max_price=price,
-                max_players_per_club=max_players_per_club,
-            )
+            with self._timer("rank"):
+                ranked = self._rank(
+                    line_ups,
+                    max_price=price,
+                    max_players_per_club=max_players_per_club,
+                )
             best = ranked[:1]
             rest = ranked[1:]
             self.history.append(best[0].points)
+            if self.stats is not None:
+                self._record_generation(line_ups, price, max_players_per_club)
+
+            stop = stop_reason(self.history, self.patience, deadline_)
+            if stop is not None:
+                reason = stop
+                break
 
             tournament_size = min(len(rest), self.tournament_size)
-            selected = self._tournament(
-                random.sample(rest, k=min(len(rest), tournament_size)),
-                max_price=price,
-                max_players_per_club=max_players_per_club,
-            )
-            offsprings = self._create_offsprings(selected, size=self.n_individuals - 1)
+            with self._timer("tournament"):
+                selected = self._tournament(
+                    self.random.sample(rest, k=min(len(rest), tournament_size)),
+                    max_price=price,
+                    max_players_per_club=max_players_per_club,
+                )
+            with self._timer("offsprings"):
+                offsprings = self._create_offsprings(
+                    selected,
+                    size=self.n_individuals - 1,
+                    max_price=price,
+                    max_players_per_club=max_players_per_club,
+                )
             line_ups = best + offsprings
 
         best = self._rank(
@@ -157,6 +434,33 @@ class Genetic(BaseAlgorithm):
             max_price=price,
             max_players_per_club=max_players_per_club,
         )[:1]
-        self.history.append(best[0].points)
-        best[0].bench = self._draft_bench(best[0])
+        best[0].stop_reason = reason
         return best[0]
+
+    def draft(self, price: float, scheme: Scheme, max_players_per_club: int) -> LineUp:
+        """Draft players following an specified scheme.
+
+        The line-up `stop_reason` tells if it ran all "generations", if it
+        "converged" or if it ran out of "time_budget".
+        """
+        deadline_ = deadline(self.time_budget)
+        self.history = []
+        if self.seed is not None:
+            # Reseed so every draft of a seeded instance is reproducible.
+            self.random.seed(self.seed)
+            if self.population is not None:
+                self.population.rng = np.random.default_rng(self.seed)
+        if self.population is not None:
+            # Islands evolve in other processes, so only their epochs are timed.
+            self.population.stats = self.stats if self.n_islands == 1 else None
+        if self.n_islands > 1:
+            draft = self._draft_islands
+        elif self.backend == "numpy":
+            draft = self._draft_numpy
+        else:
+            draft = self._draft_python
+
+        best = draft(price, scheme, max_players_per_club, deadline_)
+        self.history.append(best.points)
+        best.bench = self._draft_bench(best)
+        return best
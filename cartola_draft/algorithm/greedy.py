@@ -1,9 +1,9 @@
 """Greedy algorithm."""
 
-from typing import Sequence
+from typing import Sequence, Union
 
 from . import BaseAlgorithm, DraftError
-from .. import Player, Scheme, LineUp
+from .. import Player, PlayerPool, Scheme, LineUp
 
 
 class Greedy(BaseAlgorithm):
@@ -11,33 +11,24 @@ class Greedy(BaseAlgorithm):
 
     # pylint: disable=too-few-public-methods
 
-    def __init__(self, players: Sequence[Player]):
+    def __init__(self, players: Union[Sequence[Player], PlayerPool]):
         super().__init__(players)
-        self.players = sorted(players, key=lambda player: player.points, reverse=True)
+        self.players = self.pool.by_points
 
     def draft(self, price: float, scheme: Scheme, max_players_per_club: int) -> LineUp:
         """Draft players following an specified scheme."""
-        # Make a copy.
-        players = list(self.players)
-
         # Create line-up without any player.
         line_up = LineUp(scheme=scheme, players=[])
 
         # Iterate over players until it is able to fill the team.
-        for player in players:
+        for player in self.players:
 
-            # Check if the team has room for this player.
-            if line_up.missing(player.position) and player.price <= price:
+            # Check if the team has room, money and club slots for this player.
+            if line_up.can_add(player, price, max_players_per_club):
                 line_up.add_player(player)
-                price -= player.price
-
-                # If the addition breaks the max players per club rule, undo it.
-                if max(line_up.players_per_club.values()) > max_players_per_club:
-                    line_up.remove_player(player)
-                    price += player.price
 
-            # Check if the team is ready.
-            if line_up.is_valid():
-                return line_up
+                # Check if the team is ready.
+                if line_up.is_valid():
+                    return line_up
 
         raise DraftError("There are not enough players to form a line-up.")
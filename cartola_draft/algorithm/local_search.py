@@ -0,0 +1,174 @@
+"""Local search algorithm."""
+
+import bisect
+from typing import List, Optional, Sequence, Set, Tuple, Union
+
+from . import BaseAlgorithm
+from .greedy import Greedy
+from .. import Player, PlayerPool, Scheme, LineUp
+
+EPS = 1e-9
+
+# Slots of the line-up and the players that replace them.
+Move = List[Tuple[int, Player]]
+
+
+class LocalSearch(BaseAlgorithm):
+    """Local search refining the line-up drafted by another algorithm.
+
+    It repeatedly applies the move that increases points the most: swapping one
+    or two players for others of the same positions, within the budget and the
+    club limit. Candidates are scanned from the pool indexes sorted by points,
+    stopping as soon as they can not beat the best move found, and the cheapest
+    fitting player is found by bisecting the indexes sorted by price.
+    """
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(
+        self,
+        players: Union[Sequence[Player], PlayerPool],
+        algorithm: Optional[BaseAlgorithm] = None,
+        max_iterations: int = 100,
+    ):
+        super().__init__(players)
+        self.algorithm = Greedy(self.pool) if algorithm is None else algorithm
+        self.max_iterations = max_iterations
+        self.deterministic = self.algorithm.deterministic
+
+    @staticmethod
+    def _fits_club(
+        line_up: LineUp,
+        player: Player,
+        out: Sequence[Player],
+        into: Sequence[Player],
+        max_players_per_club: int,
+    ) -> bool:
+        """Check if a player fits the club limit after swapping players."""
+        count = (
+            line_up.players_from(player.club)
+            - sum(other.club == player.club for other in out)
+            + sum(other.club == player.club for other in into)
+        )
+        return count < max_players_per_club
+
+    def _best_replacement(
+        self,
+        line_up: LineUp,
+        position: str,
+        money: float,
+        out: Sequence[Player],
+        into: Sequence[Player],
+        max_players_per_club: int,
+        min_points: float,
+    ) -> Optional[Player]:
+        """Get the player with most points, above a minimum, that fits a slot."""
+        # pylint: disable=too-many-arguments
+        taken: Set[int] = {player.id for player in line_up.players}
+        taken.update(player.id for player in into)
+
+        def fits(player: Player) -> bool:
+            return (
+                player.price <= money + EPS
+                and player.id not in taken
+                and self._fits_club(line_up, player, out, into, max_players_per_club)
+            )
+
+        # Best player within the money, which usually fits.
+        index = bisect.bisect_right(self.pool.prices[position], money + EPS)
+        if index == 0:
+            return None
+        best = self.pool.best_by_price[position][index - 1]
+        if best.points <= min_points + EPS:
+            return None
+        if fits(best):
+            return best
+
+        for player in self.players_by_position[position]:
+            if player.points <= min_points + EPS:
+                break
+            if fits(player):
+                return player
+        return None
+
+    def _best_move(
+        self, line_up: LineUp, price: float, max_players_per_club: int
+    ) -> Optional[Move]:
+        """Get the swap of one or two players that increases points the most."""
+        # pylint: disable=too-many-locals
+        players = line_up.players
+        left = price - line_up.price
+        best_gain = 0.0
+        best_move: Optional[Move] = None
+
+        for i, out in enumerate(players):
+            player = self._best_replacement(
+                line_up,
+                out.position,
+                left + out.price,
+                [out],
+                [],
+                max_players_per_club,
+                out.points + best_gain,
+            )
+            if player is not None:
+                best_gain = player.points - out.points
+                best_move = [(i, player)]
+
+        for i, out_i in enumerate(players):
+            for j in range(i + 1, len(players)):
+                out_j = players[j]
+                pair = [out_i, out_j]
+                money = left + out_i.price + out_j.price
+                top_j = self.players_by_position[out_j.position][0].points
+                base = out_i.points + out_j.points + best_gain
+                for player_i in self.players_by_position[out_i.position]:
+                    if player_i.points + top_j <= base + EPS:
+                        break
+                    if player_i.price > money or player_i in players:
+                        continue
+                    if not self._fits_club(
+                        line_up, player_i, pair, [], max_players_per_club
+                    ):
+                        continue
+                    player_j = self._best_replacement(
+                        line_up,
+                        out_j.position,
+                        money - player_i.price,
+                        pair,
+                        [player_i],
+                        max_players_per_club,
+                        base - player_i.points,
+                    )
+                    if player_j is not None:
+                        best_gain = (
+                            player_i.points
+                            + player_j.points
+                            - out_i.points
+                            - out_j.points
+                        )
+                        base = out_i.points + out_j.points + best_gain
+                        best_move = [(i, player_i), (j, player_j)]
+
+        return best_move
+
+    def improve(
+        self, line_up: LineUp, price: float, max_players_per_club: int
+    ) -> LineUp:
+        """Improve a line-up with swaps until no swap increases its points."""
+        line_up = line_up.copy()
+        for _ in range(self.max_iterations):
+            move = self._best_move(line_up, price, max_players_per_club)
+            if move is None:
+                break
+            for i, player in move:
+                line_up[i] = player
+        return line_up
+
+    def draft(self, price: float, scheme: Scheme, max_players_per_club: int) -> LineUp:
+        """Draft players following an specified scheme."""
+        drafted = self.algorithm.draft(price, scheme, max_players_per_club)
+        line_up = self.improve(drafted, price, max_players_per_club)
+        line_up.stop_reason = drafted.stop_reason
+        line_up.bench = self._draft_bench(line_up)
+        return line_up
@@ -0,0 +1,283 @@
+"""Array-backed population engine for the genetic algorithm."""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import DraftError, stop_reason
+from .stats import NO_TIMER, Stats
+from .. import Player, Scheme, LineUp, POSITIONS
+
+
+class Population:
+    """Population of line-ups stored as a matrix of player indices.
+
+    Each row is an individual and each column is a slot of the scheme. Price,
+    points and clubs are looked up from per-player arrays, so fitness, ranking,
+    selection and mutation run as batched NumPy operations.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        players: Sequence[Player],
+        n_individuals: int,
+        tournament_size: int,
+        n_tournament_winners: int,
+        max_n_mutations: int,
+    ):
+        # pylint: disable=too-many-arguments
+        self.players = list(players)
+        self.n_individuals = n_individuals
+        self.tournament_size = tournament_size
+        self.n_tournament_winners = n_tournament_winners
+        self.max_n_mutations = max_n_mutations
+        self.rng = np.random.default_rng()
+        self.stats: Optional[Stats] = None
+
+        self.prices = np.array([p.price for p in self.players], dtype=float)
+        self.points = np.array([p.points for p in self.players], dtype=float)
+        _, self.clubs = np.unique(
+            np.array([p.club for p in self.players], dtype=int), return_inverse=True
+        )
+        self.n_clubs = int(self.clubs.max()) + 1 if self.players else 0
+        positions = np.array([p.position for p in self.players], dtype=object)
+        self.by_position = {pos: np.flatnonzero(positions == pos) for pos in POSITIONS}
+
+    def _slots(self, scheme: Scheme) -> Tuple[np.ndarray, np.ndarray]:
+        """Get a padded matrix of candidates and its length for each slot."""
+        candidates = [
+            self.by_position[pos] for pos, count in scheme.items() for _ in range(count)
+        ]
+        width = max(len(cand) for cand in candidates)
+        matrix = np.zeros((len(candidates), width), dtype=int)
+        for i, cand in enumerate(candidates):
+            matrix[i, : len(cand)] = cand
+        return matrix, np.array([len(cand) for cand in candidates])
+
+    def create(self, scheme: Scheme, size: int) -> np.ndarray:
+        """Create a random population."""
+        columns = []
+        for pos, count in scheme.items():
+            if count == 0:
+                continue
+            candidates = self.by_position[pos]
+            if len(candidates) < count:
+                raise DraftError("There are not enough players to form a line-up.")
+            keys = self.rng.random((size, len(candidates)))
+            columns.append(candidates[np.argsort(keys, axis=1)[:, :count]])
+        return np.hstack(columns)
+
+    def _timer(self, phase: str):
+        """Time a phase if stats are set."""
+        return NO_TIMER if self.stats is None else self.stats.timer(phase)
+
+    def too_many_per_club(
+        self, population: np.ndarray, max_players_per_club: int
+    ) -> np.ndarray:
+        """Check which individuals have too many players of a club."""
+        # Count players per club with a single bincount over (row, club) pairs.
+        n_rows = len(population)
+        flat = np.arange(n_rows)[:, None] * self.n_clubs + self.clubs[population]
+        per_club = np.bincount(flat.ravel(), minlength=n_rows * self.n_clubs)
+        too_many = per_club.reshape(n_rows, self.n_clubs).max(axis=1)
+        return too_many > max_players_per_club
+
+    def fitness(
+        self,
+        population: np.ndarray,
+        max_price: float,
+        max_players_per_club: int,
+    ) -> np.ndarray:
+        """Calculate fitness metric for every individual. The greater the better"""
+        if self.stats is not None:
+            self.stats.count("evaluations", len(population))
+        price = self.prices[population].sum(axis=1)
+        points = self.points[population].sum(axis=1)
+        too_many = self.too_many_per_club(population, max_players_per_club)
+        fitness = np.where(too_many, 0.0, points)
+        return np.where(price > max_price, max_price - price, fitness)
+
+    def record_generation(
+        self,
+        population: np.ndarray,
+        best_points: float,
+        max_price: float,
+        max_players_per_club: int,
+    ):
+        """Record diversity and invalid individuals of a generation in the stats."""
+        assert self.stats is not None
+        n_unique = len(np.unique(np.sort(population, axis=1), axis=0))
+        invalid = self.too_many_per_club(population, max_players_per_club)
+        invalid |= self.prices[population].sum(axis=1) > max_price
+        self.stats.generation(
+            best_points, n_unique, int(invalid.sum()), size=len(population)
+        )
+
+    def tournament(self, population: np.ndarray, fitness: np.ndarray) -> np.ndarray:
+        """Select best individuals from a random sample."""
+        size = min(len(population), self.tournament_size)
+        sample = self.rng.choice(len(population), size=size, replace=False)
+        ranked = sample[np.argsort(-fitness[sample], kind="stable")]
+        return population[ranked[: self.n_tournament_winners]]
+
+    def mutate(
+        self,
+        population: np.ndarray,
+        rows: np.ndarray,
+        slots: Tuple[np.ndarray, np.ndarray],
+    ):
+        """Change a random player of the given rows, in place."""
+        candidates, lengths = slots
+        cols = self.rng.integers(population.shape[1], size=len(rows))
+
+        # Retry only the rows that drew a player already in the line-up.
+        pending = np.ones(len(rows), dtype=bool)
+        for _ in range(10):
+            idx = np.flatnonzero(pending)
+            if len(idx) == 0:
+                break
+            draw = np.floor(self.rng.random(len(idx)) * lengths[cols[idx]]).astype(int)
+            new = candidates[cols[idx], draw]
+            duplicated = (population[rows[idx]] == new[:, None]).any(axis=1)
+            if self.stats is not None:
+                self.stats.count("mutation_retries", int(duplicated.sum()))
+            accepted = idx[~duplicated]
+            population[rows[accepted], cols[accepted]] = new[~duplicated]
+            pending[accepted] = False
+
+    def offsprings(
+        self,
+        parents: np.ndarray,
+        size: int,
+        slots: Tuple[np.ndarray, np.ndarray],
+    ) -> np.ndarray:
+        """Create offsprings for given parents."""
+        children = parents[self.rng.integers(len(parents), size=size)].copy()
+
+        # Sample how many players to mutate.
+        if self.max_n_mutations > 1:
+            n_mutations = self.rng.triangular(1, 1, self.max_n_mutations, size=size)
+            n_mutations = np.rint(n_mutations).astype(int)
+        else:
+            n_mutations = np.ones(size, dtype=int)
+
+        for i in range(int(n_mutations.max(initial=0))):
+            self.mutate(children, np.flatnonzero(n_mutations > i), slots)
+
+        return children
+
+    def evolve(
+        self,
+        population: np.ndarray,
+        n_generations: int,
+        price: float,
+        scheme: Scheme,
+        max_players_per_club: int,
+        patience: Optional[int] = None,
+        deadline: Optional[float] = None,
+    ) -> Tuple[np.ndarray, List[float], str]:
+        """Evolve a population for some generations with elitism.
+
+        It returns the last population, the best points of each generation and
+        why it stopped.
+        """
+        # pylint: disable=too-many-arguments,too-many-locals
+        slots = self._slots(scheme)
+        history: List[float] = []
+        for _ in range(n_generations):
+            with self._timer("rank"):
+                fitness = self.fitness(population, price, max_players_per_club)
+                ranked = np.argsort(-fitness, kind="stable")
+            best = population[ranked[:1]]
+            history.append(float(self.points[best[0]].sum()))
+            if self.stats is not None:
+                self.record_generation(
+                    population, history[-1], price, max_players_per_club
+                )
+
+            reason = stop_reason(history, patience, deadline)
+            if reason is not None:
+                return population, history, reason
+
+            rest = ranked[1:]
+            with self._timer("tournament"):
+                selected = self.tournament(population[rest], fitness[rest])
+            with self._timer("offsprings"):
+                offsprings = self.offsprings(selected, len(population) - 1, slots)
+            population = np.vstack([best, offsprings])
+        return population, history, "generations"
+
+    def elite(
+        self,
+        population: np.ndarray,
+        size: int,
+        price: float,
+        max_players_per_club: int,
+    ) -> np.ndarray:
+        """Get the fittest individuals."""
+        fitness = self.fitness(population, price, max_players_per_club)
+        return population[np.argsort(-fitness, kind="stable")[:size]]
+
+    def migrate(
+        self,
+        population: np.ndarray,
+        migrants: np.ndarray,
+        price: float,
+        max_players_per_club: int,
+    ) -> np.ndarray:
+        """Replace the least fit individuals by migrants."""
+        fitness = self.fitness(population, price, max_players_per_club)
+        ranked = np.argsort(-fitness, kind="stable")
+        keep = population[ranked[: len(population) - len(migrants)]]
+        return np.vstack([keep, migrants])
+
+    def best(
+        self,
+        population: np.ndarray,
+        price: float,
+        max_players_per_club: int,
+    ) -> np.ndarray:
+        """Get the fittest individual."""
+        fitness = self.fitness(population, price, max_players_per_club)
+        return population[int(np.argmax(fitness))]
+
+    def to_line_up(self, individual: np.ndarray, scheme: Scheme) -> LineUp:
+        """Convert an individual to a line-up."""
+        return LineUp(scheme=scheme, players=[self.players[i] for i in individual])
+
+
+# Population shared by the worker processes of the island model. It is set once
+# per worker by the pool initializer, so players are not pickled on each epoch.
+_WORKER_POPULATION: Optional[Population] = None
+
+
+def init_worker(population: Population):
+    """Keep the population engine in a worker process."""
+    global _WORKER_POPULATION  # pylint: disable=global-statement
+    _WORKER_POPULATION = population
+
+
+def evolve_island(
+    population: np.ndarray,
+    n_generations: int,
+    price: float,
+    scheme: Scheme,
+    max_players_per_club: int,
+    seed: int,
+    deadline: Optional[float] = None,
+) -> Tuple[np.ndarray, List[float], str]:
+    """Evolve an island in a worker process."""
+    # pylint: disable=too-many-arguments
+    assert _WORKER_POPULATION is not None
+    # Forked workers share the random state, so each epoch gets its own seed.
+    _WORKER_POPULATION.rng = np.random.default_rng(seed)
+    return _WORKER_POPULATION.evolve(
+        population,
+        n_generations=n_generations,
+        price=price,
+        scheme=scheme,
+        max_players_per_club=max_players_per_club,
+        deadline=deadline,
+    )
@@ -0,0 +1,133 @@
+"""Instrumentation of draft algorithms."""
+
+import os
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# Timer of algorithms without stats, reused since it does nothing.
+NO_TIMER = nullcontext()
+
+
+class Stats:
+    """Counters, phase timers and per-generation records of drafts.
+
+    Algorithms only touch it when it is set, so drafts without stats pay at
+    most a `None` check per phase. `on_generation` is called with the record of
+    each generation as soon as it is made.
+    """
+
+    def __init__(
+        self, on_generation: Optional[Callable[[Dict[str, Any]], None]] = None
+    ):
+        self.on_generation = on_generation
+        self.counters: Counter = Counter()
+        self.timers: Dict[str, float] = defaultdict(float)
+        self.generations: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+
+    def count(self, name: str, value: int = 1):
+        """Increase a counter."""
+        self.counters[name] += value
+
+    @contextmanager
+    def timer(self, phase: str) -> Iterator[None]:
+        """Add the time spent inside the context to a phase."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timers[phase] += time.perf_counter() - start
+
+    def generation(self, best_points: float, n_unique: int, n_invalid: int, size: int):
+        """Record a generation of a population of `size` individuals."""
+        self.count("generations")
+        self.count("duplicates", size - n_unique)
+        self.count("invalid", n_invalid)
+        record = dict(
+            generation=len(self.generations),
+            best_points=best_points,
+            diversity=n_unique / size,
+            invalid=n_invalid,
+            elapsed=time.perf_counter() - self._start,
+        )
+        self.generations.append(record)
+        if self.on_generation is not None:
+            self.on_generation(record)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Export stats as plain data."""
+        return dict(
+            counters=dict(self.counters),
+            timers=dict(self.timers),
+            generations=list(self.generations),
+        )
+
+
+class Sampler:
+    """Sampling profiler of a thread, counting functions found on its stack.
+
+    Use it as a context manager around a draft. A background thread samples the
+    stack of the calling thread every `interval` seconds, so nothing is paid
+    unless it is running.
+    """
+
+    def __init__(self, interval: float = 0.001):
+        self.interval = interval
+        self.samples = 0
+        self.total: Counter = Counter()
+        self.own: Counter = Counter()
+        self._thread_id = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def __enter__(self) -> "Sampler":
+        self._thread_id = threading.get_ident()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        """Take samples until stopped."""
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(  # pylint: disable=protected-access
+                self._thread_id
+            )
+            if frame is None:
+                continue
+            self.samples += 1
+            self.own[self._label(frame)] += 1
+            seen = set()
+            while frame is not None:
+                seen.add(self._label(frame))
+                frame = frame.f_back
+            self.total.update(seen)
+
+    @staticmethod
+    def _label(frame) -> str:
+        """Get the name of the function of a frame."""
+        module = frame.f_globals.get("__name__") or os.path.basename(
+            frame.f_code.co_filename
+        )
+        return f"{module}.{frame.f_code.co_name}"
+
+    def top(self, size: int = 10) -> List[Dict[str, Any]]:
+        """Get the functions found on most samples, with their share of samples.
+
+        `total` counts samples with the function anywhere on the stack and `own`
+        the ones with it running.
+        """
+        return [
+            dict(
+                function=label,
+                total=count / self.samples,
+                own=self.own[label] / self.samples,
+            )
+            for label, count in self.total.most_common(size)
+        ]
@@ -1,79 +1,333 @@
-"""Azure function."""
-
-import json
-import logging
-from typing import Any, Callable, Dict, List
-
-import azure.functions as func
-
-from cartola_draft import Player, Scheme
-from cartola_draft.algorithm import DraftError
-from cartola_draft.algorithm.greedy import Greedy
-from cartola_draft.algorithm.genetic import Genetic
-
-
-def parse_scheme(scheme: Dict[str, int]) -> Scheme:
-    """Parse scheme argument."""
-    sch = Scheme(scheme)
-    if not sch.is_valid():
-        raise ValueError(f"{scheme} is not a valid scheme.")
-    return sch
-
-
-def parse_algorithm(name: str) -> Callable:
-    """Parse algorithm argument."""
-    if "greedy" in name.lower():
-        return Greedy
-    if "genetic" in name.lower():
-        return Genetic
-    raise ValueError(f"{name} is not a valid algorithm")
-
-
-def parse_players(players: List[Dict[str, Any]]) -> List[Player]:
-    """Parse players argument."""
-    return [Player(**player) for player in players]
-
-
-def parse_price(price: float) -> float:
-    """Parse price argument."""
-    if price <= 0:
-        raise ValueError("Price should be positive")
-    return price
-
-
-def parse_max_players_per_club(max_players_per_club: float) -> float:
-    """Parse min_clubs argument."""
-    max_players_per_club = int(max_players_per_club)
-    if max_players_per_club < 1:
-        raise ValueError("Max players per club should be greater than zero.")
-    return max_players_per_club
-
-
-def main(req: func.HttpRequest) -> func.HttpResponse:
-    """Azure function execution."""
-    logging.info("Python HTTP trigger function processed a request.")
-
-    # Load arguments
-    args = req.get_json()
-
-    # Parse arguments.
-    scheme = parse_scheme(args["scheme"])
-    algo_class = parse_algorithm(args["algorithm"])
-    players = parse_players(args["players"])
-    price = parse_price(args["price"])
-    max_players_per_club = parse_max_players_per_club(args["max_players_per_club"])
-
-    # Create algorithm instance.
-    algo = algo_class(players)
-
-    # Draft line-up.
-    try:
-        line_up = algo.draft(price, scheme, max_players_per_club)
-    except DraftError as error:
-        return func.HttpResponse(
-            str(error),
-            status_code=400,
-        )
-
-    body = dict(players=line_up.players, bench=line_up.bench)
-    return func.HttpResponse(json.dumps(body, default=vars), status_code=200)
+"""Azure function."""
+
+import asyncio
+import hashlib
+import inspect
+import json
+import logging
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import azure.functions as func
+
+from cartola_draft import LineUp, Player, PlayerPool, Scheme
+from cartola_draft.algorithm import BaseAlgorithm, DraftError, DraftRequest
+from cartola_draft.algorithm.exact import Exact
+from cartola_draft.algorithm.greedy import Greedy
+from cartola_draft.algorithm.genetic import Genetic
+from cartola_draft.algorithm.local_search import LocalSearch
+from cartola_draft.algorithm.stats import Sampler, Stats
+from .cache import FileCache, LRUCache
+from .stream import parse_players_text, split_body
+
+# Players pools of recent rounds, keyed by a hash of the players payload.
+POOLS = LRUCache(max_size=4, max_age=6 * 60 * 60)
+
+# Responses of deterministic drafts, keyed by a hash of the whole request. Set
+# RESULT_CACHE_DIR to keep them in local files instead of memory.
+RESULTS: Union[LRUCache, FileCache]
+if os.environ.get("RESULT_CACHE_DIR"):
+    RESULTS = FileCache(os.environ["RESULT_CACHE_DIR"], max_size=1024)
+else:
+    RESULTS = LRUCache(max_size=256)
+
+# Process pool running drafts, sized by DRAFT_WORKERS or the number of CPUs.
+EXECUTOR: Optional[ProcessPoolExecutor] = None
+# Drafts being run and how many requests wait for each, keyed by request.
+IN_FLIGHT: Dict[str, "asyncio.Future[Tuple[str, int, bool]]"] = {}
+WAITERS: Counter = Counter()
+# How long a request waits for its draft by default.
+TIMEOUT_MS = 60 * 1000
+
+
+def parse_scheme(scheme: Dict[str, int]) -> Scheme:
+    """Parse scheme argument."""
+    sch = Scheme(scheme)
+    if not sch.is_valid():
+        raise ValueError(f"{scheme} is not a valid scheme.")
+    return sch
+
+
+def parse_algorithm(name: str) -> Callable:
+    """Parse algorithm argument.
+
+    Names with "local" refine the line-up of the other algorithm in the name,
+    or of the greedy algorithm, with a local search.
+    """
+    if "local" in name.lower():
+        base = name.lower().replace("local", "")
+        if not any(other in base for other in ["greedy", "genetic", "exact"]):
+            return LocalSearch
+        base_class = parse_algorithm(base)
+
+        def local_search(players: Union[Sequence[Player], PlayerPool], **options):
+            pool = PlayerPool.of(players)
+            algorithm = create_algorithm(base_class, pool, **options)
+            return LocalSearch(pool, algorithm=algorithm)
+
+        return local_search
+    if "greedy" in name.lower():
+        return Greedy
+    if "genetic" in name.lower():
+        return Genetic
+    if "exact" in name.lower():
+        return Exact
+    raise ValueError(f"{name} is not a valid algorithm")
+
+
+def parse_players(players: List[Dict[str, Any]]) -> List[Player]:
+    """Parse players argument."""
+    return [Player(**player) for player in players]
+
+
+def parse_price(price: float) -> float:
+    """Parse price argument."""
+    if price <= 0:
+        raise ValueError("Price should be positive")
+    return price
+
+
+def parse_max_players_per_club(max_players_per_club: float) -> int:
+    """Parse min_clubs argument."""
+    max_players_per_club = int(max_players_per_club)
+    if max_players_per_club < 1:
+        raise ValueError("Max players per club should be greater than zero.")
+    return max_players_per_club
+
+
+def parse_time_budget_ms(time_budget_ms: Optional[float]) -> Optional[float]:
+    """Parse time_budget_ms argument, returning it in seconds."""
+    if time_budget_ms is None:
+        return None
+    if time_budget_ms <= 0:
+        raise ValueError("Time budget should be positive.")
+    return time_budget_ms / 1000
+
+
+def fingerprint(players: str) -> str:
+    """Get a content hash of a players JSON array."""
+    return hashlib.blake2b(players.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def load_pool(players: str, players_fingerprint: str) -> PlayerPool:
+    """Get the pool of a players JSON array, parsing it only on a cache miss."""
+    return POOLS.get_or_set(
+        players_fingerprint,
+        lambda: PlayerPool(parse_players_text(players).to_players()),
+    )
+
+
+def create_algorithm(
+    algo_class: Callable,
+    players: Union[Sequence[Player], PlayerPool],
+    **options,
+):
+    """Create an algorithm instance with the options its initializer accepts."""
+    params = inspect.signature(algo_class).parameters
+    if not any(param.kind == param.VAR_KEYWORD for param in params.values()):
+        options = {key: val for key, val in options.items() if key in params}
+    return algo_class(players, **options)
+
+
+def parse_requests(requests: List[Dict[str, Any]]) -> List[DraftRequest]:
+    """Parse requests argument of a batch draft."""
+    if len(requests) == 0:
+        raise ValueError("Requests should not be empty.")
+    return [
+        DraftRequest(
+            price=parse_price(request["price"]),
+            scheme=parse_scheme(request["scheme"]),
+            max_players_per_club=parse_max_players_per_club(
+                request["max_players_per_club"]
+            ),
+        )
+        for request in requests
+    ]
+
+
+def line_up_body(line_up: LineUp) -> Dict[str, Any]:
+    """Create the response body of a line-up."""
+    return dict(
+        players=line_up.players,
+        bench=line_up.bench,
+        scheme=line_up.scheme.positions,
+        stop_reason=line_up.stop_reason,
+    )
+
+
+def request_key(players_fingerprint: str, args: Dict[str, Any]) -> str:
+    """Get a canonical hash of a draft request."""
+    canonical = json.dumps([players_fingerprint, args], sort_keys=True)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def draft_body(algo: BaseAlgorithm, args: Dict[str, Any]) -> Tuple[str, int]:
+    """Draft line-ups for the request arguments, returning body and status."""
+    # Draft many line-ups.
+    if "requests" in args:
+        requests = parse_requests(args["requests"])
+        if not args.get("best", False):
+            results = [
+                (
+                    {"error": str(result)}
+                    if isinstance(result, DraftError)
+                    else line_up_body(result)
+                )
+                for result in algo.draft_many(requests)
+            ]
+            return json.dumps(dict(results=results), default=dict), 200
+        try:
+            line_up = algo.draft_best(requests)
+        except DraftError as error:
+            return str(error), 400
+        return json.dumps(line_up_body(line_up), default=dict), 200
+
+    scheme = parse_scheme(args["scheme"])
+    price = parse_price(args["price"])
+    max_players_per_club = parse_max_players_per_club(args["max_players_per_club"])
+
+    # Draft line-up.
+    try:
+        line_up = algo.draft(price, scheme, max_players_per_club)
+    except DraftError as error:
+        return str(error), 400
+
+    return json.dumps(line_up_body(line_up), default=dict), 200
+
+
+def stats_event(
+    args: Dict[str, Any], stats: Optional[Stats], sampler: Optional[Sampler]
+) -> Dict[str, Any]:
+    """Create an Application Insights style custom event of a draft."""
+    dimensions: Dict[str, str] = dict(algorithm=str(args["algorithm"]))
+    measurements: Dict[str, float] = {}
+    if stats is not None:
+        measurements.update(stats.counters)
+        measurements.update(
+            (f"{phase}_seconds", seconds) for phase, seconds in stats.timers.items()
+        )
+        dimensions["generations"] = json.dumps(stats.generations)
+    if sampler is not None:
+        measurements["samples"] = sampler.samples
+        dimensions["profile"] = json.dumps(sampler.top())
+    return dict(
+        name="DraftStats",
+        customDimensions=dimensions,
+        customMeasurements=measurements,
+    )
+
+
+def handle(
+    args: Dict[str, Any], players: str, players_fingerprint: str
+) -> Tuple[str, int, bool]:
+    """Draft a request, returning body, status and if the draft is deterministic.
+
+    It runs in a worker process, so each worker keeps its own players pools.
+    """
+    # Parse arguments.
+    algo_class = parse_algorithm(args["algorithm"])
+    pool = load_pool(players, players_fingerprint)
+    time_budget = parse_time_budget_ms(args.get("time_budget_ms"))
+    logging.info("Players pool cache: %s", POOLS.metrics())
+
+    # Create algorithm instance.
+    algo = create_algorithm(
+        algo_class, pool, time_budget=time_budget, seed=args.get("seed")
+    )
+    if args.get("stats", False):
+        algo.stats = Stats()
+    sampler = Sampler() if args.get("profile", False) else None
+
+    with sampler or nullcontext():
+        body, status_code = draft_body(algo, args)
+
+    if algo.stats is not None or sampler is not None:
+        logging.info(json.dumps(stats_event(args, algo.stats, sampler)))
+    return body, status_code, algo.deterministic
+
+
+def get_executor() -> ProcessPoolExecutor:
+    """Get the process pool that runs drafts, creating it on first use."""
+    global EXECUTOR  # pylint: disable=global-statement
+    if EXECUTOR is None:
+        max_workers = int(os.environ.get("DRAFT_WORKERS", os.cpu_count() or 1))
+        EXECUTOR = ProcessPoolExecutor(max_workers=max_workers)
+    return EXECUTOR
+
+
+async def coalesce(
+    key: str, submit: Callable[[], "asyncio.Future[Tuple[str, int, bool]]"]
+) -> Tuple[str, int, bool]:
+    """Wait for the in-flight draft of a request, submitting it if there is none.
+
+    The draft is shared by every waiter and only cancelled when the last one
+    stops waiting. A draft already running in a worker can not be interrupted,
+    so it is left to finish.
+    """
+
+    def forget(done: "asyncio.Future[Tuple[str, int, bool]]"):
+        if IN_FLIGHT.get(key) is done:
+            del IN_FLIGHT[key]
+
+    future = IN_FLIGHT.get(key)
+    if future is None:
+        future = IN_FLIGHT[key] = submit()
+        future.add_done_callback(forget)
+    WAITERS[key] += 1
+    try:
+        return await asyncio.shield(future)
+    finally:
+        WAITERS[key] -= 1
+        if WAITERS[key] == 0:
+            del WAITERS[key]
+            future.cancel()
+
+
+async def main(req: func.HttpRequest) -> func.HttpResponse:
+    """Azure function execution.
+
+    The payload either has a single `scheme`, `price` and
+    `max_players_per_club`, or a list of `requests` with those keys to draft
+    them all from the same players. With `best` set, a batch returns only the
+    line-up with most points. Responses of deterministic drafts (e.g. a
+    genetic algorithm with a `seed`) are cached.
+
+    Drafts run in a process pool, identical concurrent requests share a single
+    draft and requests waiting longer than `timeout_ms` get a timeout response.
+    With `stats` or `profile` set, counters, phase timers and a sampling profile
+    of the draft are logged as a JSON custom event.
+    """
+    logging.info("Python HTTP trigger function processed a request.")
+
+    # Load arguments, leaving players to be parsed only if not cached.
+    args, players = split_body(req.get_body())
+    players_fingerprint = fingerprint(players)
+    timeout = parse_time_budget_ms(args.get("timeout_ms", TIMEOUT_MS))
+
+    # Reuse the response of a previous identical request. Only deterministic
+    # drafts are ever stored.
+    key = request_key(players_fingerprint, args)
+    body = RESULTS.get(key)
+    if body is not None:
+        return func.HttpResponse(body, status_code=200)
+
+    loop = asyncio.get_running_loop()
+    try:
+        body, status_code, deterministic = await asyncio.wait_for(
+            coalesce(
+                key,
+                lambda: loop.run_in_executor(
+                    get_executor(), handle, args, players, players_fingerprint
+                ),
+            ),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        return func.HttpResponse("Draft timed out.", status_code=504)
+
+    if deterministic and status_code == 200:
+        RESULTS.set(key, body)
+    return func.HttpResponse(body, status_code=status_code)
@@ -0,0 +1,136 @@
+"""Process-level caches kept warm across invocations."""
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used and expired entries."""
+
+    def __init__(self, max_size: int = 8, max_age: Optional[float] = None):
+        self.max_size = max_size
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable):
+        return key in self._entries and not self._expired(key)
+
+    def _expired(self, key: Hashable) -> bool:
+        """Check if an entry is older than the max age."""
+        if self.max_age is None:
+            return False
+        created, _ = self._entries[key]
+        return time.monotonic() - created > self.max_age
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get an entry, counting hits and misses."""
+        if key in self._entries and self._expired(key):
+            del self._entries[key]
+            self.evictions += 1
+        if key not in self._entries:
+            self.misses += 1
+            return default
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return self._entries[key][1]
+
+    def set(self, key: Hashable, value: Any):
+        """Set an entry, evicting the least recently used ones over max size."""
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get_or_set(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Get an entry, creating it on a miss."""
+        value = self.get(key, default=self)
+        if value is self:
+            value = factory()
+            self.set(key, value)
+        return value
+
+    def clear(self):
+        """Remove every entry and reset metrics."""
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def metrics(self) -> Dict[str, int]:
+        """Get cache metrics."""
+        return dict(
+            size=len(self._entries),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
+
+
+class FileCache:
+    """Bounded cache of text values stored as one file per key in a directory."""
+
+    def __init__(self, path: str, max_size: int = 1024):
+        self.path = path
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(path, exist_ok=True)
+
+    def __len__(self):
+        return len(os.listdir(self.path))
+
+    def __contains__(self, key: str):
+        return os.path.exists(self._file(key))
+
+    def _file(self, key: str) -> str:
+        """Get the file of a key."""
+        return os.path.join(self.path, f"{key}.json")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Get an entry, counting hits and misses."""
+        try:
+            with open(self._file(key), mode="r", encoding="utf-8") as file:
+                value = file.read()
+        except FileNotFoundError:
+            self.misses += 1
+            return default
+        self.hits += 1
+        os.utime(self._file(key))
+        return value
+
+    def set(self, key: str, value: str):
+        """Set an entry, evicting the least recently used ones over max size."""
+        # Write to a temporary file first so readers never see partial values.
+        temp = f"{self._file(key)}.{os.getpid()}.tmp"
+        with open(temp, mode="w", encoding="utf-8") as file:
+            file.write(value)
+        os.replace(temp, self._file(key))
+
+        files = [os.path.join(self.path, name) for name in os.listdir(self.path)]
+        files = sorted(files, key=os.path.getmtime)
+        for file_ in files[: max(len(files) - self.max_size, 0)]:
+            os.remove(file_)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every entry and reset metrics."""
+        for name in os.listdir(self.path):
+            os.remove(os.path.join(self.path, name))
+        self.hits = self.misses = self.evictions = 0
+
+    def metrics(self) -> Dict[str, int]:
+        """Get cache metrics."""
+        return dict(
+            size=len(self),
+            hits=self.hits,
+            misses=self.misses,
+            evictions=self.evictions,
+        )
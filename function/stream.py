@@ -0,0 +1,133 @@
+"""Incremental decoding of draft requests."""
+
+import json
+import re
+from array import array
+from typing import Any, Dict, List, Tuple, Union
+
+from cartola_draft import POSITIONS, Player
+
+PLAYER_KEYS = ("id", "position", "price", "points", "club")
+PLAYER_KEY_SET = set(PLAYER_KEYS)
+POSITION_CODES = {pos: code for code, pos in enumerate(POSITIONS)}
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+DECODER = json.JSONDecoder()
+# Decodes objects into their length, to find where the players array ends
+# without building any dict.
+SKIMMER = json.JSONDecoder(object_pairs_hook=len)
+
+
+class PlayerColumns:
+    """Players stored as typed arrays, one per attribute."""
+
+    # pylint: disable=too-few-public-methods
+
+    def __init__(self):
+        self.id = array("q")  # pylint: disable=invalid-name
+        self.position = array("b")
+        self.price = array("d")
+        self.points = array("d")
+        self.club = array("q")
+
+    def __len__(self):
+        return len(self.id)
+
+    def append(self, player: Dict[str, Any]):
+        """Append a player from its decoded JSON object."""
+        if player.keys() != PLAYER_KEY_SET:
+            missing = [key for key in PLAYER_KEYS if key not in player]
+            extra = [key for key in player if key not in PLAYER_KEY_SET]
+            raise TypeError(f"Player is missing keys {missing} or has extra {extra}")
+        position = POSITION_CODES.get(player["position"])
+        if position is None:
+            raise ValueError(f"{player['position']} is not a valid position.")
+
+        self.id.append(player["id"])
+        self.position.append(position)
+        self.price.append(player["price"])
+        self.points.append(player["points"])
+        self.club.append(player["club"])
+
+    def to_players(self) -> List[Player]:
+        """Create player objects."""
+        return [
+            Player(
+                id=id_,
+                position=POSITIONS[position],
+                price=price,
+                points=points,
+                club=club,
+            )
+            for id_, position, price, points, club in zip(
+                self.id, self.position, self.price, self.points, self.club
+            )
+        ]
+
+
+def _skip(text: str, index: int) -> int:
+    """Skip whitespaces."""
+    return WHITESPACE.match(text, index).end()  # type: ignore
+
+
+def _peek(text: str, index: int) -> str:
+    """Get the next character after whitespaces."""
+    return text[_skip(text, index) : _skip(text, index) + 1]
+
+
+def _expect(text: str, index: int, chars: str) -> Tuple[str, int]:
+    """Check the next character after whitespaces."""
+    index = _skip(text, index)
+    if index >= len(text) or text[index] not in chars:
+        raise ValueError(f"Expecting one of {chars!r} at char {index}.")
+    return text[index], index + 1
+
+
+def parse_players_text(text: str) -> PlayerColumns:
+    """Decode a players JSON array into columns.
+
+    Every player object is handed to the columns as soon as it is decoded, so
+    the array holds only `None` placeholders instead of dicts.
+    """
+    columns = PlayerColumns()
+    decoder = json.JSONDecoder(object_hook=columns.append)
+    players, index = decoder.raw_decode(text, _skip(text, 0))
+    if not isinstance(players, list) or _skip(text, index) != len(text):
+        raise TypeError("Players should be an array of objects.")
+    return columns
+
+
+def split_body(body: Union[bytes, str]) -> Tuple[Dict[str, Any], str]:
+    """Split a request body into its arguments and the raw players array.
+
+    The players array is only skimmed to find where it ends and is returned as
+    text, so it can be fingerprinted before paying for parsing.
+    """
+    text = body.decode("utf-8") if isinstance(body, bytes) else body
+    args: Dict[str, Any] = {}
+    players = "[]"
+
+    _, index = _expect(text, 0, "{")
+    if _peek(text, index) == "}":
+        return args, players
+    while True:
+        key, index = DECODER.raw_decode(text, _skip(text, index))
+        _, index = _expect(text, index, ":")
+        if key == "players":
+            start = _skip(text, index)
+            _, index = SKIMMER.raw_decode(text, start)
+            players = text[start:index]
+        else:
+            args[key], index = DECODER.raw_decode(text, _skip(text, index))
+        char, index = _expect(text, index, ",}")
+        if char == "}":
+            return args, players
+
+
+def parse_body(body: Union[bytes, str]) -> Tuple[Dict[str, Any], PlayerColumns]:
+    """Parse a request body, decoding players straight into columns.
+
+    Other arguments are small and returned as a dict. Players never exist as a
+    list of dicts: each one is decoded, validated and appended to the columns.
+    """
+    args, players = split_body(body)
+    return args, parse_players_text(players)
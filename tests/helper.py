@@ -1,5 +1,6 @@
 """Helper functions for unit-tests."""
 
+import dataclasses
 import json
 import os
 import random
@@ -9,6 +10,7 @@ import cartola_draft as draft
 
 THIS_FOLDER = os.path.dirname(__file__)
 PLAYERS_JSON_PATH = os.path.join(THIS_FOLDER, "data", "players.json")
+REQ_JSON_PATH = os.path.join(THIS_FOLDER, "data", "req.json")
 POSITIONS = ["goalkeeper", "fullback", "defender", "midfielder", "forward", "coach"]
 SCHEMES_COUNTING = {
     442: {
@@ -88,11 +90,33 @@ def load_players_dict() -> List[Dict[str, Any]]:
         return json.load(file)
 
 
+def load_request_dict(**kwargs) -> Dict[str, Any]:
+    """Create a draft request payload."""
+    with open(REQ_JSON_PATH, mode="r", encoding="utf-8") as file:
+        args = json.load(file)
+    args.update(price=100, max_players_per_club=12)
+    args.update(kwargs)
+    return args
+
+
 def load_players() -> List[draft.Player]:
     """Create line-up players."""
     return [draft.Player(**player) for player in load_players_dict()]
 
 
+def load_players_from_one_club(club: int = 262) -> List[draft.Player]:
+    """Create players where the best four fifths of each position share a club."""
+    players = []
+    for pos_players in load_players_by_position().values():
+        pos_players = sorted(pos_players, key=lambda p: p.points, reverse=True)
+        n_club = len(pos_players) * 4 // 5
+        players += [
+            dataclasses.replace(player, club=club) for player in pos_players[:n_club]
+        ]
+        players += pos_players[n_club:]
+    return players
+
+
 def load_players_by_position() -> Dict[str, List[draft.Player]]:
     """Create line-up players."""
     # Load players.
@@ -0,0 +1,148 @@
+"""Unit tests for exact algorithm."""
+
+import itertools
+import timeit
+
+import pytest
+
+from cartola_draft import Scheme
+from cartola_draft.algorithm import DraftError
+from cartola_draft.algorithm.exact import Exact
+from cartola_draft.algorithm.greedy import Greedy
+from cartola_draft.algorithm.stats import Stats
+from . import helper
+
+MAX_EXEC_TIME = 0.5  # seconds
+SCHEMES = {
+    442: Scheme(helper.SCHEMES_COUNTING[442]),
+    352: Scheme(helper.SCHEMES_COUNTING[352]),
+}
+
+
+def brute_force(players, price, scheme, max_players_per_club):
+    """Find the maximum points by checking every line-up."""
+    by_position = [
+        itertools.combinations([p for p in players if p.position == pos], count)
+        for pos, count in scheme.items()
+    ]
+    best = None
+    for combination in itertools.product(*by_position):
+        line_up = [player for group in combination for player in group]
+        clubs = [player.club for player in line_up]
+        if sum(player.price for player in line_up) > price:
+            continue
+        if max(clubs.count(club) for club in clubs) > max_players_per_club:
+            continue
+        points = sum(player.points for player in line_up)
+        if best is None or points > best:
+            best = points
+    return best
+
+
+class TestTypicalDraft:
+    """Test draft method from Exact class."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.algo = Exact(helper.load_players())
+
+    def test_line_up_is_valid(self):
+        """Test if line up is valid.."""
+        line_up = self.algo.draft(100, SCHEMES[442], 12)
+        assert line_up.is_valid()
+
+    def test_price(self):
+        """Test if the budget is respected."""
+        line_up = self.algo.draft(60, SCHEMES[442], 12)
+        assert line_up.price <= 60
+
+    def test_max_players_per_club(self):
+        """Test if max players per club is respected."""
+        line_up = self.algo.draft(100, SCHEMES[442], 2)
+        clubs = [player.club for player in line_up.players]
+        assert max(clubs.count(club) for club in clubs) <= 2
+
+    def test_better_than_greedy(self):
+        """Test if it is at least as good as the greedy algorithm."""
+        for scheme in SCHEMES.values():
+            greedy = Greedy(helper.load_players()).draft(100, scheme, 12)
+            line_up = self.algo.draft(100, scheme, 12)
+            assert line_up.points >= greedy.points
+
+    def test_bench_amount(self):
+        """Test if bench was drafted correctly."""
+        line_up = self.algo.draft(100, SCHEMES[352], 3)
+        assert len(line_up.bench) == 4
+
+    @staticmethod
+    def test_stats():
+        """Test if phases are timed."""
+        algo = Exact(helper.load_players())
+        algo.stats = Stats()
+        algo.draft(100, SCHEMES[442], 12)
+        assert set(algo.stats.timers) == {"prune", "knapsack", "search", "bench"}
+
+    def test_speed(self):
+        """Test if draft is fast."""
+        times = timeit.timeit(lambda: self.algo.draft(60, SCHEMES[442], 2), number=5)
+        assert times < MAX_EXEC_TIME * 5
+
+
+class TestOptimality:
+    """Compare against a brute force search over a small pool."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        by_position = helper.load_players_by_position()
+        cls.players = [p for players in by_position.values() for p in players[:4]]
+        cls.scheme = Scheme(
+            {
+                "goalkeeper": 1,
+                "fullback": 2,
+                "defender": 2,
+                "midfielder": 3,
+                "forward": 2,
+                "coach": 1,
+            }
+        )
+
+    def test_optimal(self):
+        """Test if it finds the maximum points."""
+        algo = Exact(self.players)
+        for price, max_players_per_club in [(200, 12), (70, 12), (60, 2), (80, 1)]:
+            expected = brute_force(
+                self.players, price, self.scheme, max_players_per_club
+            )
+            if expected is None:
+                with pytest.raises(DraftError):
+                    algo.draft(price, self.scheme, max_players_per_club)
+                continue
+            line_up = algo.draft(price, self.scheme, max_players_per_club)
+            assert line_up.points == pytest.approx(expected)
+
+
+class TestExtremeCases:
+    """Test exceptions."""
+
+    @staticmethod
+    def test_one_club():
+        """Test if the club limit holds when one club has most players."""
+        line_up = Exact(helper.load_players_from_one_club()).draft(100, SCHEMES[442], 3)
+        assert line_up.is_valid()
+        assert line_up.max_per_club <= 3
+
+    @staticmethod
+    def test_few_players():
+        """Test trying to use few players."""
+        algo = Exact(helper.load_players()[:10])
+        with pytest.raises(DraftError):
+            algo.draft(100, SCHEMES[442], 12)
+
+    @staticmethod
+    def test_low_price():
+        """Test trying to draft with a price too low."""
+        algo = Exact(helper.load_players())
+        with pytest.raises(DraftError):
+            algo.draft(5, SCHEMES[442], 12)
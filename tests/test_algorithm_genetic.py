@@ -1,16 +1,19 @@
 """Unit tests for genetic algorithm."""
 
-import cProfile
+import time
 import timeit
 
 import pytest
 
-from cartola_draft import Scheme
+from cartola_draft import LineUp, Scheme
 from cartola_draft.algorithm import DraftError
-from cartola_draft.algorithm.genetic import Genetic
+from cartola_draft.algorithm.genetic import BACKENDS, Genetic
+from cartola_draft.algorithm.greedy import Greedy
+from cartola_draft.algorithm.stats import Sampler, Stats
 from . import helper
 
 MAX_EXEC_TIME = 30  # seconds. Needs to be improved
+MAX_EXEC_TIME_NUMPY = 3  # seconds
 SCHEMES = {
     442: Scheme(helper.SCHEMES_COUNTING[442]),
     352: Scheme(helper.SCHEMES_COUNTING[352]),
@@ -62,10 +65,235 @@ class TestTypicalDraft:
                     for starter in starters:
                         assert player.price < starter.price
 
+
+class TestNumpyDraft(TestTypicalDraft):
+    """Test draft method from Genetic class with the numpy backend."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.algo = Genetic(helper.load_players(), backend="numpy")
+
+    def test_speed(self):
+        """Test if draft is fast."""
+        times = timeit.timeit(lambda: self.algo.draft(100, SCHEMES[442], 12), number=5)
+        assert times < MAX_EXEC_TIME_NUMPY * 5
+
+
+class TestStopping:
+    """Test early stopping."""
+
+    @staticmethod
+    def test_generations():
+        """Test running every generation."""
+        for backend in BACKENDS:
+            algo = Genetic(helper.load_players(), n_generations=10, backend=backend)
+            line_up = algo.draft(100, SCHEMES[442], 12)
+            assert line_up.stop_reason == "generations"
+            assert len(algo.history) == 11
+
+    @staticmethod
+    def test_converged():
+        """Test stopping when there is no improvement."""
+        for backend in BACKENDS:
+            algo = Genetic(helper.load_players(), patience=5, backend=backend)
+            line_up = algo.draft(100, SCHEMES[442], 12)
+            assert line_up.stop_reason == "converged"
+            assert len(algo.history) < 500
+            assert max(algo.history[-6:-1]) <= algo.history[-7]
+
+    @staticmethod
+    def test_time_budget():
+        """Test stopping when time is over."""
+        for backend in BACKENDS:
+            algo = Genetic(helper.load_players(), time_budget=0.05, backend=backend)
+            start = time.perf_counter()
+            line_up = algo.draft(100, SCHEMES[442], 12)
+            assert time.perf_counter() - start < 1
+            assert line_up.stop_reason == "time_budget"
+            assert line_up.is_valid()
+
+
+class TestFitnessCache:
+    """Test fitness memoization."""
+
+    @staticmethod
+    def test_order_independent():
+        """Test if the same players in another order hit the cache."""
+        algo = Genetic(helper.load_players())
+        players = helper.get_random_players_with_scheme(SCHEMES[442])
+        line_up = LineUp(SCHEMES[442], list(players))
+        shuffled = LineUp(SCHEMES[442], list(reversed(players)))
+
+        first = algo._evaluate(line_up, 100, 12)  # pylint: disable=protected-access
+        second = algo._evaluate(shuffled, 100, 12)  # pylint: disable=protected-access
+        assert first == second
+        assert (algo.cache_hits, algo.cache_misses) == (1, 1)
+
+    @staticmethod
+    def test_bounded():
+        """Test if the cache does not grow over its size."""
+        algo = Genetic(helper.load_players(), n_generations=20, cache_size=50)
+        algo.draft(100, SCHEMES[442], 12)
+        assert algo.cache_hits > 0
+        assert len(algo._cache) <= 50  # pylint: disable=protected-access
+
+
+class TestSeed:
+    """Test reproducible drafts."""
+
+    @staticmethod
+    def test_same_seed():
+        """Test if the same seed drafts the same line-up."""
+        for backend in BACKENDS:
+            line_ups = [
+                Genetic(
+                    helper.load_players(), n_generations=20, backend=backend, seed=42
+                ).draft(100, SCHEMES[442], 3)
+                for _ in range(2)
+            ]
+            assert [p.id for p in line_ups[0].players] == [
+                p.id for p in line_ups[1].players
+            ]
+
+    @staticmethod
+    def test_reused_instance():
+        """Test if a seeded instance drafts the same line-up again."""
+        for backend in BACKENDS:
+            algo = Genetic(
+                helper.load_players(), n_generations=20, backend=backend, seed=7
+            )
+            first = algo.draft(100, SCHEMES[442], 3)
+            second = algo.draft(100, SCHEMES[442], 3)
+            assert [p.id for p in first.players] == [p.id for p in second.players]
+
+    @staticmethod
+    def test_deterministic():
+        """Test if only seeded drafts without a time budget are deterministic."""
+        players = helper.load_players()
+        assert Genetic(players, seed=1).deterministic
+        assert not Genetic(players).deterministic
+        assert not Genetic(players, seed=1, time_budget=1).deterministic
+
+
+class TestOperators:
+    """Test mutation and crossover."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.algo = Genetic(helper.load_players(), seed=0)
+        cls.line_up = Greedy(helper.load_players()).draft(100, SCHEMES[442], 3)
+
+    def test_mutation_keeps_valid(self):
+        """Test if mutations keep the line-up within budget and club limit."""
+        line_up = self.line_up.copy()
+        for _ in range(500):
+            # pylint: disable=protected-access
+            self.algo._change_random_player(line_up, 100, 3)
+            assert line_up.is_valid()
+            assert line_up.price <= 100 + 1e-9
+            assert max(line_up.players_per_club.values()) <= 3
+            assert len({p.id for p in line_up.players}) == len(line_up)
+
+    def test_mutation_over_budget(self):
+        """Test if mutations of a line-up over budget do not make it pricier."""
+        line_up = self.line_up.copy()
+        for _ in range(100):
+            price = line_up.price
+            self.algo._change_random_player(line_up, 5, 12)  # pylint: disable=W0212
+            assert line_up.price <= price
+
+    def test_crossover(self):
+        """Test if crossover follows the scheme with players from both parents."""
+        other = self.algo._create_random_line_up(  # pylint: disable=W0212
+            helper.load_players(), SCHEMES[442], 3
+        )
+        for _ in range(20):
+            child = self.algo._crossover(self.line_up, other)  # pylint: disable=W0212
+            assert child.is_valid()
+            assert len(set(child.players)) == len(child)
+            assert set(child.players) <= set(self.line_up.players + other.players)
+
+
+class TestStats:
+    """Test instrumentation of drafts."""
+
+    @staticmethod
+    def test_stats():
+        """Test if counters, timers and generations are recorded."""
+        for backend in BACKENDS:
+            records = []
+            algo = Genetic(helper.load_players(), n_generations=20, backend=backend)
+            algo.stats = Stats(on_generation=records.append)
+            algo.draft(100, SCHEMES[442], 3)
+            assert algo.stats.generations == records
+            assert len(records) == algo.stats.counters["generations"] == 20
+            assert all(0 < record["diversity"] <= 1 for record in records)
+            assert algo.stats.counters["evaluations"] > 0
+            assert {"create", "rank", "tournament", "offsprings", "bench"} <= set(
+                algo.stats.timers
+            )
+
+    @staticmethod
+    def test_sampler():
+        """Test if the profiler finds where the draft spends time."""
+        algo = Genetic(helper.load_players(), n_generations=20)
+        with Sampler() as sampler:
+            algo.draft(100, SCHEMES[442], 3)
+        assert sampler.samples > 0
+        functions = [row["function"] for row in sampler.top(size=50)]
+        assert "cartola_draft.algorithm.genetic.draft" in functions
+
+
+class TestIslandDraft:
+    """Test draft method from Genetic class with islands."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.algo = Genetic(
+            helper.load_players(),
+            n_generations=40,
+            backend="numpy",
+            n_islands=3,
+            migration_interval=15,
+            n_workers=2,
+        )
+
+    def test_line_up_is_valid(self):
+        """Test if line up is valid.."""
+        line_up = self.algo.draft(100, SCHEMES[442], 12)
+        assert line_up.is_valid()
+
+    def test_max_players_per_club(self):
+        """Test if max players per club is respected."""
+        line_up = self.algo.draft(100, SCHEMES[442], 2)
+        assert max(line_up.players_per_club.values()) <= 2
+
+    def test_history(self):
+        """Test if every generation is recorded once."""
+        algo = Genetic(
+            helper.load_players(),
+            n_generations=20,
+            backend="numpy",
+            n_islands=2,
+            migration_interval=7,
+        )
+        algo.draft(100, SCHEMES[442], 12)
+        assert len(algo.history) == 21
+
+
 class TestExtremeCases:
     """Test exceptions."""
 
-    # pylint: disable=too-few-public-methods
+    @staticmethod
+    def test_one_club():
+        """Test if the club limit holds when one club has most players."""
+        for backend in BACKENDS:
+            algo = Genetic(helper.load_players_from_one_club(), backend=backend)
+            line_up = algo.draft(100, SCHEMES[442], 3)
+            assert line_up.max_per_club <= 3
 
     @staticmethod
     def test_few_players():
@@ -74,7 +302,21 @@ class TestExtremeCases:
         with pytest.raises(DraftError):
             algo.draft(100, SCHEMES[442], 12)
 
+    @staticmethod
+    def test_few_players_numpy():
+        """Test trying to use few players with the numpy backend."""
+        algo = Genetic(helper.load_players()[:10], backend="numpy")
+        with pytest.raises(DraftError):
+            algo.draft(100, SCHEMES[442], 12)
+
+    @staticmethod
+    def test_invalid_backend():
+        """Test trying to use an unknown backend."""
+        with pytest.raises(ValueError):
+            Genetic(helper.load_players(), backend="fortran")
 
-if __name__ == "__main__":
-    # Profiling.
-    cProfile.run("Genetic(helper.load_players()).draft(100, SCHEMES[442])")
+    @staticmethod
+    def test_islands_python_backend():
+        """Test trying to use islands with the python backend."""
+        with pytest.raises(ValueError):
+            Genetic(helper.load_players(), n_islands=2)
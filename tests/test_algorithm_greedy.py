@@ -4,8 +4,8 @@ import timeit
 
 import pytest
 
-from cartola_draft import Scheme
-from cartola_draft.algorithm import DraftError
+from cartola_draft import PlayerPool, Scheme
+from cartola_draft.algorithm import DraftError, DraftRequest
 from cartola_draft.algorithm.greedy import Greedy
 from . import helper
 
@@ -40,14 +40,71 @@ class TestTypicalDraft:
         assert times < MAX_EXEC_TIME * 100
 
 
+class TestDraftMany:
+    """Test drafting many line-ups at once."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.algo = Greedy(helper.load_players())
+        cls.requests = [
+            DraftRequest(price, Scheme(scheme), 12)
+            for scheme in helper.SCHEMES_COUNTING.values()
+            for price in [5, 200]
+        ]
+
+    def test_draft_many(self):
+        """Test if every request gets a line-up or an error."""
+        results = self.algo.draft_many(self.requests)
+        assert len(results) == len(self.requests)
+        for request, result in zip(self.requests, results):
+            if request.price == 5:
+                assert isinstance(result, DraftError)
+            else:
+                assert result.is_valid()
+                assert result.scheme == request.scheme
+
+    def test_draft_best(self):
+        """Test if it returns the line-up with most points."""
+        best = self.algo.draft_best(self.requests)
+        points = [
+            result.points
+            for result in self.algo.draft_many(self.requests)
+            if not isinstance(result, DraftError)
+        ]
+        assert best.points == max(points)
+
+    def test_draft_best_not_possible(self):
+        """Test if it raises when no request can be drafted."""
+        with pytest.raises(DraftError):
+            self.algo.draft_best(self.requests[:1])
+
+
 class TestExtremeCases:
     """Test exceptions."""
 
     # pylint: disable=too-few-public-methods
 
+    @staticmethod
+    def test_one_club():
+        """Test if the club limit holds when one club has most players."""
+        line_up = Greedy(helper.load_players_from_one_club()).draft(
+            100, SCHEMES[442], 3
+        )
+        assert line_up.is_valid()
+        assert line_up.max_per_club <= 3
+
     @staticmethod
     def test_few_players():
         """Test trying to use few players."""
         algo = Greedy(helper.load_players()[:10])
         with pytest.raises(DraftError):
             algo.draft(100, SCHEMES[442], 12)
+
+    @staticmethod
+    def test_shared_pool():
+        """Test drafting from a pool shared with other algorithms."""
+        pool = PlayerPool(helper.load_players())
+        algo = Greedy(pool)
+        assert algo.pool is pool
+        assert algo.draft(100, SCHEMES[442], 12).is_valid()
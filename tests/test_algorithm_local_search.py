@@ -0,0 +1,109 @@
+"""Unit tests for local search algorithm."""
+
+import pytest
+
+from cartola_draft import PlayerPool, Scheme
+from cartola_draft.algorithm import DraftError
+from cartola_draft.algorithm.exact import Exact
+from cartola_draft.algorithm.genetic import Genetic
+from cartola_draft.algorithm.greedy import Greedy
+from cartola_draft.algorithm.local_search import LocalSearch
+from . import helper
+
+SCHEMES = {
+    442: Scheme(helper.SCHEMES_COUNTING[442]),
+    352: Scheme(helper.SCHEMES_COUNTING[352]),
+}
+
+
+class TestTypicalDraft:
+    """Test draft method from LocalSearch class."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.algo = LocalSearch(helper.load_players())
+
+    def test_line_up_is_valid(self):
+        """Test if line up is valid.."""
+        line_up = self.algo.draft(100, SCHEMES[442], 12)
+        assert line_up.is_valid()
+
+    def test_not_worse(self):
+        """Test if it never loses points from the greedy line-up."""
+        greedy = Greedy(helper.load_players())
+        for scheme in SCHEMES.values():
+            for price in [100, 140]:
+                drafted = greedy.draft(price, scheme, 5)
+                assert self.algo.draft(price, scheme, 5).points >= drafted.points
+
+    def test_bench(self):
+        """Test if bench was drafted for the improved line-up."""
+        line_up = self.algo.draft(100, SCHEMES[352], 3)
+        assert len(line_up.bench) == 4
+        for player in line_up.bench:
+            starters = line_up.players_by_position[player.position]
+            assert player.price < min(starter.price for starter in starters)
+
+
+class TestImprove:
+    """Test refining line-ups of another algorithm."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.pool = PlayerPool(helper.load_players())
+        cls.genetic = Genetic(cls.pool, n_generations=10, backend="numpy", seed=0)
+        cls.algo = LocalSearch(cls.pool, algorithm=cls.genetic)
+
+    def test_constraints(self):
+        """Test if swaps respect the budget and the club limit."""
+        for scheme in SCHEMES.values():
+            for price, max_players_per_club in [(60, 3), (80, 2), (100, 1)]:
+                line_up = self.algo.draft(price, scheme, max_players_per_club)
+                assert line_up.is_valid()
+                assert line_up.price <= price + 1e-9
+                assert max(line_up.players_per_club.values()) <= max_players_per_club
+                assert len(set(line_up.players)) == len(line_up)
+
+    def test_improves(self):
+        """Test if it gets closer to the best line-up."""
+        exact = Exact(self.pool)
+        for scheme in SCHEMES.values():
+            drafted = self.genetic.draft(70, scheme, 3)
+            improved = self.algo.improve(drafted, 70, 3)
+            best = exact.draft(70, scheme, 3)
+            assert drafted.points < improved.points <= best.points + 1e-9
+
+    def test_local_optimum(self):
+        """Test if no single swap improves the result."""
+        line_up = self.algo.draft(70, SCHEMES[442], 3)
+        for i, out in enumerate(line_up.players):
+            for player in self.pool.by_position[out.position]:
+                swapped = line_up.copy()
+                if player in swapped or player.points <= out.points:
+                    continue
+                swapped[i] = player
+                assert swapped.price > 70 or max(swapped.players_per_club.values()) > 3
+
+
+class TestExtremeCases:
+    """Test exceptions."""
+
+    # pylint: disable=too-few-public-methods
+
+    @staticmethod
+    def test_one_club():
+        """Test if the club limit holds when one club has most players."""
+        line_up = LocalSearch(helper.load_players_from_one_club()).draft(
+            100, SCHEMES[442], 3
+        )
+        assert line_up.is_valid()
+        assert line_up.max_per_club <= 3
+
+    @staticmethod
+    def test_few_players():
+        """Test trying to use few players."""
+        algo = LocalSearch(helper.load_players()[:10])
+        with pytest.raises(DraftError):
+            algo.draft(100, SCHEMES[442], 12)
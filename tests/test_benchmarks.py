@@ -0,0 +1,66 @@
+"""Unit tests for the benchmark runner."""
+
+from benchmarks import run
+from . import helper
+
+
+class TestScalePlayers:
+    """Test creating bigger pools."""
+
+    @staticmethod
+    def test_scale():
+        """Test if copies keep positions and clubs with unique ids."""
+        players = helper.load_players()
+        scaled = run.scale_players(players, 3)
+        assert len(scaled) == 3 * len(players)
+        assert len({p.id for p in scaled}) == len(scaled)
+        assert scaled[: len(players)] == players
+        for i, player in enumerate(scaled):
+            original = players[i % len(players)]
+            assert (player.position, player.club) == (original.position, original.club)
+
+    @staticmethod
+    def test_reproducible():
+        """Test if the same scale always creates the same pool."""
+        players = helper.load_players()
+        assert run.scale_players(players, 2) == run.scale_players(players, 2)
+
+
+class TestCompare:
+    """Test finding regressions."""
+
+    @staticmethod
+    def test_compare():
+        """Test if slower or worse cases regress."""
+        baseline = dict(
+            cases={
+                "same": dict(seconds=0.1, quality=1.0),
+                "slower": dict(seconds=0.1, quality=1.0),
+                "noise": dict(seconds=0.001),
+                "worse": dict(seconds=0.1, quality=1.0),
+                "new": dict(seconds=0.1),
+            }
+        )
+        results = dict(
+            cases={
+                "same": dict(seconds=0.15, quality=1.0),
+                "slower": dict(seconds=0.3, quality=1.0),
+                "noise": dict(seconds=0.005),
+                "worse": dict(seconds=0.1, quality=0.9),
+                "other": dict(seconds=10),
+            }
+        )
+        regressions = run.compare(results, baseline)
+        assert [r.split(":")[0] for r in regressions] == ["slower", "worse"]
+
+    @staticmethod
+    def test_quality():
+        """Test if quality is relative to the best points of the same draft."""
+        cases = [
+            dict(scheme="442", price=100, scale=1, points=50.0),
+            dict(scheme="442", price=100, scale=1, points=40.0),
+            dict(scheme="442", price=100, scale=1, points=None),
+            dict(scheme="442", price=100, scale=10, points=60.0),
+        ]
+        run.add_quality(cases)
+        assert [case["quality"] for case in cases] == [1.0, 0.8, None, 1.0]
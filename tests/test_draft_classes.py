@@ -1,7 +1,10 @@
 """Test classes."""
 
+import dataclasses
 import random
 
+import pytest
+
 import cartola_draft as draft
 from . import helper
 
@@ -96,15 +99,50 @@ class TestLineUp:
         assert len(line_up.players) == 0
 
         # Add a random player.
-        player = helper.get_random_players(amount=1, position="goalkeeper")
+        [player] = helper.get_random_players(amount=1, position="goalkeeper")
         line_up.add_player(player)
         assert len(line_up.players) == 1
 
         # Add another random player.
-        player = helper.get_random_players(amount=1, position="coach")
+        [player] = helper.get_random_players(amount=1, position="coach")
         line_up.add_player(player)
         assert len(line_up.players) == 2
 
+    def test_cached_aggregates(self):
+        """Test if aggregates follow changes in the line-up."""
+        players = helper.get_random_players_with_scheme(self.schemes[442])
+        line_up = draft.LineUp(self.schemes[442], list(players))
+
+        # Swap, remove and add players, then compare with a fresh line-up.
+        [new] = helper.get_random_players(amount=1, position=players[0].position)
+        line_up[0] = new
+        line_up.remove_player(line_up[-1])
+        copy = line_up.copy()
+        copy.add_player(players[-1])
+
+        for changed in [line_up, copy]:
+            fresh = draft.LineUp(changed.scheme, list(changed.players))
+            assert changed.points == pytest.approx(fresh.points)
+            assert changed.price == pytest.approx(fresh.price)
+            assert changed.clubs == fresh.clubs
+            assert changed.players_per_club == fresh.players_per_club
+            assert changed.max_per_club == fresh.max_per_club
+
+    def test_max_per_club(self):
+        """Test if the most players from a club follows random changes."""
+        players = helper.load_players()
+        line_up = draft.LineUp(self.schemes[442], players=[])
+        for _ in range(2000):
+            player = random.choice(players)
+            if player in line_up:
+                line_up.remove_player(player)
+            elif len(line_up) > 0 and random.random() < 0.5:
+                line_up[random.randrange(len(line_up))] = player
+            else:
+                line_up.add_player(player)
+            counts = line_up.players_per_club.values()
+            assert line_up.max_per_club == max(counts, default=0)
+
     def test_needs_position(self):
         """Test adding players."""
         # Construct a dict with the position name and a list of random players.
@@ -125,6 +163,36 @@ class TestLineUp:
             else:
                 assert not missing
 
+    def test_remaining(self):
+        """Test counting slots still to be filled."""
+        players = helper.get_random_players_with_scheme(self.schemes[442])
+        line_up = draft.LineUp(self.schemes[442], players=[])
+        for i, player in enumerate(players):
+            assert line_up.remaining == len(players) - i
+            assert not line_up.is_valid()
+            line_up.add_player(player)
+        assert line_up.remaining == 0
+        assert line_up.is_valid()
+
+    def test_can_add(self):
+        """Test checking if a player can be added."""
+        line_up = draft.LineUp(self.schemes[442], players=[])
+        goalkeeper = helper.get_random_players_from_club(1, "goalkeeper", 262)[0]
+        other = helper.get_random_players(1, "goalkeeper")[0]
+        forward = helper.get_random_players_from_club(1, "forward", 262)[0]
+
+        # Budget.
+        assert not line_up.can_add(goalkeeper, goalkeeper.price - 0.01, 12)
+        assert line_up.can_add(goalkeeper, goalkeeper.price, 12)
+
+        # Scheme.
+        line_up.add_player(goalkeeper)
+        assert not line_up.can_add(other, 100, 12)
+
+        # Club limit.
+        assert not line_up.can_add(forward, 100, 1)
+        assert line_up.can_add(forward, 100, 2)
+
     def test_list(self):
         """Test converting to a list."""
         # Construct a dict with the position name and a list of random players.
@@ -159,6 +227,7 @@ class TestLineUp:
 
         line_up = draft.LineUp(scheme, players)
         assert max(line_up.players_per_club.values()) == 4
+        assert line_up.max_per_club == 4
 
 
 class TestScheme:
@@ -182,11 +251,56 @@ class TestScheme:
 class TestPlayer:
     """Test Player class."""
 
-    # pylint: disable=too-few-public-methods
-
     @staticmethod
     def test_dict():
         """Test converting to dict."""
         args = dict(id=1, position=2, price=3, points=4, club=5)
         player = draft.Player(**args)
         assert dict(player) == args
+
+    @staticmethod
+    def test_immutable():
+        """Test that players cannot be changed or get new attributes."""
+        player = draft.Player(id=1, position="coach", price=3, points=4, club=5)
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            player.price = 10  # type: ignore
+        assert not hasattr(player, "__dict__")
+
+
+class TestPlayerPool:
+    """Test PlayerPool class."""
+
+    @classmethod
+    def setup_class(cls):
+        """Setup class."""
+        cls.players = helper.load_players()
+        cls.pool = draft.PlayerPool(cls.players)
+
+    def test_by_position(self):
+        """Test if players are grouped by position and sorted by points."""
+        for pos, players in self.pool.by_position.items():
+            assert all(player.position == pos for player in players)
+            points = [player.points for player in players]
+            assert points == sorted(points, reverse=True)
+        assert sum(len(players) for players in self.pool.by_position.values()) == len(
+            self.players
+        )
+
+    def test_best_cheaper_than(self):
+        """Test finding the best player cheaper than a price."""
+        for pos in helper.POSITIONS:
+            for price in [0, 1, 3.5, 5, 10, 100]:
+                cheaper = [
+                    p for p in self.players if p.position == pos and p.price < price
+                ]
+                player = self.pool.best_cheaper_than(pos, price)
+                if not cheaper:
+                    assert player is None
+                else:
+                    assert player.price < price
+                    assert player.points == max(p.points for p in cheaper)
+
+    def test_of(self):
+        """Test reusing an existing pool."""
+        assert draft.PlayerPool.of(self.pool) is self.pool
+        assert isinstance(draft.PlayerPool.of(self.players), draft.PlayerPool)
@@ -1,15 +1,26 @@
 """Unit tests for AWS lambda function."""
 
-# import json
+import asyncio
+import json
+import logging
+import statistics
+import os
+import time
 
+import azure.functions as func
 import pytest
 
 import function
+from function.stream import parse_body, split_body
 from cartola_draft import Player, Scheme
+from cartola_draft.algorithm.exact import Exact
 from cartola_draft.algorithm.greedy import Greedy
 from cartola_draft.algorithm.genetic import Genetic
+from cartola_draft.algorithm.local_search import LocalSearch
 from . import helper
 
+MAX_P99 = 30  # seconds
+
 
 class TestScheme:
     """Test scheme parsing."""
@@ -48,6 +59,31 @@ class TestAlgorithm:
             algo = function.parse_algorithm(name)(helper.load_players())
             assert isinstance(algo, Genetic)
 
+    @staticmethod
+    def test_exact():
+        """Test parsing exact algorithm."""
+        for name in ["Exact", "exact", "EXACT", "eXaCt", "exact algorithm"]:
+            # Create instance.
+            algo = function.parse_algorithm(name)(helper.load_players())
+            assert isinstance(algo, Exact)
+
+    @staticmethod
+    def test_local_search():
+        """Test parsing local search over other algorithms."""
+        for name, base in [
+            ("local search", Greedy),
+            ("LocalSearch", Greedy),
+            ("greedy+local", Greedy),
+            ("genetic local search", Genetic),
+            ("exact_local", Exact),
+        ]:
+            algo = function.create_algorithm(
+                function.parse_algorithm(name), helper.load_players(), seed=1
+            )
+            assert isinstance(algo, LocalSearch)
+            assert isinstance(algo.algorithm, base)
+            assert algo.algorithm.pool is algo.pool
+
     @staticmethod
     def test_strange_name():
         """Make sure it raises when receiving invalid values.."""
@@ -82,3 +118,365 @@ class TestPlayers:
         players[0]["extra"] = 0.0  # Add the key 'extra' to a single dict
         with pytest.raises(TypeError):
             function.parse_players(players)
+
+
+class TestParseBody:
+    """Test decoding players straight into columns."""
+
+    @staticmethod
+    def test_valid():
+        """Test parsing valid values."""
+        args = helper.load_request_dict()
+        parsed, columns = parse_body(json.dumps(args).encode())
+        assert parsed == {key: val for key, val in args.items() if key != "players"}
+        assert columns.to_players() == function.parse_players(args["players"])
+
+    @staticmethod
+    def test_missing_keys():
+        """Test if it raises when missing keys.."""
+        args = helper.load_request_dict()
+        args["players"][-1].pop("points")
+        with pytest.raises(TypeError):
+            parse_body(json.dumps(args))
+
+    @staticmethod
+    def test_too_many_keys():
+        """Test if it raises when there are extra keys.."""
+        args = helper.load_request_dict()
+        args["players"][0]["extra"] = 0.0
+        with pytest.raises(TypeError):
+            parse_body(json.dumps(args))
+
+    @staticmethod
+    def test_invalid_position():
+        """Test if it raises with an unknown position."""
+        args = helper.load_request_dict()
+        args["players"][0]["position"] = "libero"
+        with pytest.raises(ValueError):
+            parse_body(json.dumps(args))
+
+    @staticmethod
+    def test_malformed():
+        """Test if it raises with malformed JSON."""
+        for body in ["", "[]", '{"players": [{}', '{"players": 1}', '{"a": 1 "b": 2}']:
+            with pytest.raises((TypeError, ValueError)):
+                parse_body(body)
+
+
+class TestLRUCache:
+    """Test cache used across invocations."""
+
+    @staticmethod
+    def test_max_size():
+        """Test evicting the least recently used entry."""
+        cache = function.LRUCache(max_size=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+        assert "b" not in cache
+        assert cache.get("a") == 1
+        assert cache.metrics() == dict(size=2, hits=2, misses=0, evictions=1)
+
+    @staticmethod
+    def test_max_age():
+        """Test evicting expired entries."""
+        cache = function.LRUCache(max_age=0.01)
+        cache.set("a", 1)
+        time.sleep(0.02)
+        assert cache.get("a") is None
+        assert cache.metrics() == dict(size=0, hits=0, misses=1, evictions=1)
+
+    @staticmethod
+    def test_get_or_set():
+        """Test creating entries only on misses."""
+        cache = function.LRUCache()
+        assert cache.get_or_set("a", lambda: 1) == 1
+        assert cache.get_or_set("a", lambda: 2) == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+
+
+class TestFileCache:
+    """Test cache kept in local files."""
+
+    @staticmethod
+    def test_get_set(tmp_path):
+        """Test storing and loading entries."""
+        cache = function.FileCache(str(tmp_path))
+        assert cache.get("a") is None
+        cache.set("a", '{"points": 1}')
+        assert "a" in cache
+        assert cache.get("a") == '{"points": 1}'
+        assert function.FileCache(str(tmp_path)).get("a") == '{"points": 1}'
+        assert cache.metrics() == dict(size=1, hits=1, misses=1, evictions=0)
+
+    @staticmethod
+    def test_max_size(tmp_path):
+        """Test evicting the least recently used files."""
+        cache = function.FileCache(str(tmp_path), max_size=2)
+        for i, key in enumerate("abc"):
+            cache.set(key, key)
+            os.utime(tmp_path / f"{key}.json", (i, i))
+        assert len(cache) == 2
+        assert "a" not in cache
+        assert cache.metrics()["evictions"] == 1
+
+
+class TestResultCache:
+    """Test reusing responses of identical requests."""
+
+    @staticmethod
+    def test_seeded_genetic():
+        """Test if a seeded genetic request is answered from the cache."""
+        function.RESULTS.clear()
+        args = helper.load_request_dict(algorithm="genetic", seed=3)
+        first = call(args)
+        second = call(args)
+        assert first.status_code == second.status_code == 200
+        assert first.get_body() == second.get_body()
+        assert function.RESULTS.metrics()["hits"] == 1
+
+    @staticmethod
+    def test_greedy():
+        """Test if a greedy request is answered from the cache."""
+        function.RESULTS.clear()
+        args = helper.load_request_dict()
+        call(args)
+        call(helper.load_request_dict(price=80))
+        call(args)
+        assert function.RESULTS.metrics()["hits"] == 1
+        assert function.RESULTS.metrics()["misses"] == 2
+
+    @staticmethod
+    def test_not_deterministic():
+        """Test if unseeded or time bounded requests are not cached."""
+        function.RESULTS.clear()
+        for args in [
+            helper.load_request_dict(algorithm="genetic"),
+            helper.load_request_dict(algorithm="genetic", seed=3, time_budget_ms=50),
+        ]:
+            call(args)
+            call(args)
+        assert len(function.RESULTS) == 0
+
+    @staticmethod
+    def test_errors():
+        """Test if failed drafts are not cached."""
+        function.RESULTS.clear()
+        args = helper.load_request_dict(players=helper.load_players_dict()[:10])
+        call(args)
+        assert len(function.RESULTS) == 0
+
+
+class TestStats:
+    """Test logging draft stats."""
+
+    @staticmethod
+    def test_event(caplog):
+        """Test if stats and profile are logged as a custom event."""
+        caplog.set_level(logging.INFO)
+        args = helper.load_request_dict(algorithm="genetic", stats=True, profile=True)
+        handle(args)
+        events = [
+            json.loads(record.message)
+            for record in caplog.records
+            if record.message.startswith("{")
+        ]
+        assert [event["name"] for event in events] == ["DraftStats"]
+        assert events[0]["customMeasurements"]["generations"] > 0
+        assert events[0]["customMeasurements"]["samples"] > 0
+        assert json.loads(events[0]["customDimensions"]["profile"])
+
+    @staticmethod
+    def test_disabled(caplog):
+        """Test if nothing is logged by default."""
+        caplog.set_level(logging.INFO)
+        handle(helper.load_request_dict(algorithm="exact"))
+        assert not [r for r in caplog.records if r.message.startswith("{")]
+
+
+class TestPoolCache:
+    """Test keeping players pools warm across invocations."""
+
+    @staticmethod
+    def test_same_players():
+        """Test if the same players reuse the pool."""
+        function.POOLS.clear()
+        first = handle(helper.load_request_dict())
+        second = handle(helper.load_request_dict(algorithm="exact", price=80))
+        assert first[1] == second[1] == 200
+        assert function.POOLS.metrics() == dict(size=1, hits=1, misses=1, evictions=0)
+
+    @staticmethod
+    def test_other_players():
+        """Test if other players get their own pool."""
+        function.POOLS.clear()
+        handle(helper.load_request_dict())
+        players = helper.load_players_dict()
+        players[0]["points"] += 1
+        handle(helper.load_request_dict(players=players))
+        assert function.POOLS.metrics()["misses"] == 2
+
+
+class TestTimeBudget:
+    """Test time budget argument parsing."""
+
+    @staticmethod
+    def test_valid():
+        """Test parsing valid values."""
+        assert function.parse_time_budget_ms(None) is None
+        assert function.parse_time_budget_ms(1500) == 1.5
+
+    @staticmethod
+    def test_not_valid():
+        """Test if it raises when not positive."""
+        for value in [0, -10]:
+            with pytest.raises(ValueError):
+                function.parse_time_budget_ms(value)
+
+
+def request(args) -> func.HttpRequest:
+    """Create an HTTP request."""
+    return func.HttpRequest(
+        method="POST",
+        url="/api/cartola-draft",
+        body=json.dumps(args).encode(),
+    )
+
+
+def call(args) -> func.HttpResponse:
+    """Run the function for a request."""
+    return asyncio.run(function.main(request(args)))
+
+
+def handle(args):
+    """Run the worker side of the function for a request."""
+    args, players = split_body(json.dumps(args))
+    return function.handle(args, players, function.fingerprint(players))
+
+
+class TestMain:
+    """Test function execution."""
+
+    @staticmethod
+    def test_greedy():
+        """Test drafting with greedy algorithm."""
+        response = call(helper.load_request_dict())
+        body = json.loads(response.get_body())
+        assert response.status_code == 200
+        assert len(body["players"]) == 12
+        assert body["stop_reason"] is None
+
+    @staticmethod
+    def test_time_budget():
+        """Test drafting with a time budget."""
+        args = helper.load_request_dict(algorithm="genetic", time_budget_ms=50)
+        response = call(args)
+        body = json.loads(response.get_body())
+        assert response.status_code == 200
+        assert body["stop_reason"] == "time_budget"
+
+    @staticmethod
+    def test_batch():
+        """Test drafting many line-ups in one request."""
+        args = helper.load_request_dict(
+            requests=[
+                dict(scheme=scheme, price=price, max_players_per_club=3)
+                for scheme in helper.SCHEMES_COUNTING.values()
+                for price in [5, 200]
+            ]
+        )
+        response = call(args)
+        results = json.loads(response.get_body())["results"]
+        assert response.status_code == 200
+        assert len(results) == len(args["requests"])
+        for args_, result in zip(args["requests"], results):
+            if args_["price"] == 5:
+                assert "error" in result
+            else:
+                assert result["scheme"] == args_["scheme"]
+
+    @staticmethod
+    def test_batch_best():
+        """Test drafting the best line-up over many schemes."""
+        args = helper.load_request_dict(
+            best=True,
+            requests=[
+                dict(scheme=scheme, price=100, max_players_per_club=3)
+                for scheme in helper.SCHEMES_COUNTING.values()
+            ],
+        )
+        response = call(args)
+        body = json.loads(response.get_body())
+        assert response.status_code == 200
+        assert body["scheme"] in helper.SCHEMES_COUNTING.values()
+
+    @staticmethod
+    def test_not_enough_players():
+        """Test if it responds with bad request."""
+        args = helper.load_request_dict(players=helper.load_players_dict()[:10])
+        response = call(args)
+        assert response.status_code == 400
+
+
+async def gather(requests):
+    """Run the function for concurrent requests, timing each one."""
+
+    async def timed(args):
+        start = time.perf_counter()
+        response = await function.main(request(args))
+        return response, time.perf_counter() - start
+
+    return await asyncio.gather(*[timed(args) for args in requests])
+
+
+class TestConcurrency:
+    """Test handling concurrent requests."""
+
+    @staticmethod
+    def test_coalesce():
+        """Test if identical concurrent requests share a single draft."""
+        args = helper.load_request_dict(algorithm="genetic")
+        results = asyncio.run(gather([args] * 5))
+        bodies = {response.get_body() for response, _ in results}
+        assert len(bodies) == 1
+        assert not function.IN_FLIGHT
+
+    @staticmethod
+    def test_timeout():
+        """Test if it responds with a timeout when the deadline passes."""
+        args = helper.load_request_dict(algorithm="genetic", timeout_ms=1, seed=5)
+        response = call(args)
+        assert response.status_code == 504
+
+    @staticmethod
+    def test_cancel():
+        """Test if a cancelled request stops waiting for its draft."""
+
+        async def cancelled():
+            args = helper.load_request_dict(algorithm="genetic", price=90)
+            task = asyncio.create_task(function.main(request(args)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert not function.IN_FLIGHT
+            assert not function.WAITERS
+
+        asyncio.run(cancelled())
+
+    @staticmethod
+    def test_load():
+        """Measure latency percentiles under concurrent requests."""
+        requests = [
+            helper.load_request_dict(algorithm=algorithm, price=price)
+            for algorithm in ["greedy", "exact"]
+            for price in range(100, 150, 2)
+        ]
+        requests += [helper.load_request_dict(algorithm="genetic", seed=1)] * 2
+        results = asyncio.run(gather(requests))
+        assert all(response.status_code == 200 for response, _ in results)
+        latencies = [latency for _, latency in results]
+        percentiles = statistics.quantiles(latencies, n=100)
+        print(f"p50: {percentiles[49]:.3f}s, p99: {percentiles[98]:.3f}s")
+        assert percentiles[98] < MAX_P99